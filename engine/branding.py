@@ -11,11 +11,79 @@ Tested against CentOS Stream 9 boot ISO structure:
   .treeinfo              — (DVD ISOs only)
 """
 
+import io
 import os
 import re
-import shutil
-import glob
+import mmap
+import sys
+import configparser
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from engine.fsutil import fast_copy, link_or_copy
+
+
+# Volume label detection, compiled once at import
+_RE_LABEL_HD = re.compile(r"hd:LABEL=(\S+)")
+_RE_LABEL_SEARCH = re.compile(r"-l\s+'([^']+)'")
+
+# Substitution rules as (group name, pattern). Each file type fuses its
+# rules into one alternation (see _fuse) so it is scanned exactly once.
+_RULE_RESCUE = ("rescue", r"(?i:Rescue a\s+\S+(?:\s+\S+)?\s+system)")
+_RULE_MENU_TITLE = ("menu_title", r"(?i:menu title .*)")
+_RULE_TIMEOUT_GRUB = ("timeout", r"set timeout=\d+")
+_RULE_TIMEOUT_LEGACY = ("timeout", r"timeout \d+")
+
+
+# Files at least this large are read through mmap (see _read_text)
+_MMAP_MIN_SIZE = 64 * 1024
+
+
+def _read_text(path):
+    """
+    Read a text file, mapping it straight from the page cache when large.
+    Small files (.discinfo, most boot configs) take the plain read path.
+    """
+    if os.stat(path).st_size < _MMAP_MIN_SIZE:
+        return Path(path).read_text()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return str(mm, "utf-8")
+
+
+def _write_if_changed(path, original, content):
+    """Write content back only if patching changed it. Returns True if written."""
+    if content == original:
+        return False
+    Path(path).write_text(content)
+    return True
+
+
+def _set_isolinux_timeout(content, timeout_line):
+    """
+    Rewrite every 'timeout N' line in one line scan, appending the
+    directive if the config has none.
+    """
+    lines = content.splitlines(keepends=True)
+    found = False
+    for i, line in enumerate(lines):
+        if line.startswith("timeout ") and line[8:9].isdigit():
+            lines[i] = timeout_line + line[len(line.rstrip("\r\n")):]
+            found = True
+    if not found:
+        if lines and not lines[-1].endswith("\n"):
+            lines[-1] += "\n"
+        lines.append(timeout_line + "\n")
+    return "".join(lines)
+
+
+def _fuse(*rules):
+    """Compile (group name, pattern) rules into one named alternation."""
+    return re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in rules))
+
+
+def _sub_fused(pattern, replacements, text):
+    """Single-pass substitution, dispatching each match on its group name."""
+    return pattern.sub(lambda m: replacements[m.lastgroup], text)
 
 
 class BrandingEngine:
@@ -32,6 +100,31 @@ class BrandingEngine:
         r"Fedora\s+\d+",
     ]
 
+    # All upstream names (plus the unversioned CentOS/RHEL forms) unioned
+    # into one pattern — every branch maps to the same replacement, so a
+    # single left-to-right pass is equivalent to running them in sequence.
+    UPSTREAM_RE = re.compile(
+        "|".join(f"(?:{p})" for p in UPSTREAM_PATTERNS + [
+            r"CentOS\s+Stream(?!\s*\d)",
+            r"CentOS(?!\s*Stream)(?!\s*-)",
+            r"Red\s+Hat\s+Enterprise\s+Linux",
+        ]),
+        re.IGNORECASE
+    )
+    _RULE_DISTRO = ("distro", f"(?i:{UPSTREAM_RE.pattern})")
+
+    # Lowercase substrings every UPSTREAM_RE match must contain — text
+    # with none of them can skip the regex pass entirely
+    UPSTREAM_KEYWORDS = ("centos", "enterprise", "rocky", "almalinux", "fedora")
+
+    LEGACY_GRUB_RE = _fuse(_RULE_DISTRO, _RULE_TIMEOUT_LEGACY)
+    TREEINFO_RE = _fuse(
+        ("family", r"family = .*"),
+        ("name", r"name = .*"),
+        ("short", r"short = .*"),
+        ("version", r"version = .*"),
+    )
+
     def __init__(self, iso_root: Path, manifest: dict):
         self.iso_root = iso_root
         self.manifest = manifest
@@ -40,92 +133,158 @@ class BrandingEngine:
         self.version = manifest["version"]
         self.vendor = manifest.get("vendor", "")
         self.os_id = self.branding.get("os_id", self.name.lower().replace(" ", "-"))
+        self.boot_timeout = manifest.get("boot_timeout", 60)
+        self._report = []
 
         # Build the new volume ID (max 32 chars)
-        vol_id = f"{self.name}-{self.version}-x86_64"
         arch = manifest.get("build_system", {}).get("arch", "x86_64")
         vol_id = f"{self.name}-{self.version}-{arch}"
         if len(vol_id) > 32:
             vol_id = vol_id[:32]
         self.new_volume_id = vol_id.replace(" ", "-")
 
-        # Detect original volume ID from grub.cfg or isolinux.cfg
+        # Detect original volume ID from grub.cfg or isolinux.cfg.
+        # Configs read here are kept for the patch steps (see _read_config).
+        self._config_cache = {}
         self.original_volume_id = self._detect_original_volume_id()
 
+        # The volume label rules embed the detected label, so the fused
+        # GRUB/isolinux patterns are built per instance.
+        label_rules = []
+        if self.original_volume_id:
+            old_label = re.escape(self.original_volume_id)
+            label_rules = [("label", f"hd:LABEL={old_label}"), ("search", f"'{old_label}'")]
+        self._grub_re = _fuse(
+            *label_rules, _RULE_RESCUE, self._RULE_DISTRO, _RULE_TIMEOUT_GRUB
+        )
+        self._isolinux_re = _fuse(
+            *label_rules, _RULE_MENU_TITLE, _RULE_RESCUE, self._RULE_DISTRO
+        )
+
+        # Replacement text for each rule, built once
+        name, version, timeout = self.name, self.version, self.boot_timeout
+        common = {
+            "label": f"hd:LABEL={self.new_volume_id}",
+            "search": f"'{self.new_volume_id}'",
+            "rescue": f"Rescue a {name} system",
+            "distro": name,
+        }
+        self._grub_repl = {**common, "timeout": f"set timeout={timeout}"}
+        self._isolinux_repl = {**common, "menu_title": f"menu title {name} {version}"}
+        # isolinux uses tenths of seconds
+        self._isolinux_timeout = f"timeout {timeout}0"
+        self._legacy_grub_repl = {"distro": name, "timeout": f"timeout {timeout}"}
+
+        # Release file contents, built once
+        os_id = self.os_id
+        bug_url = manifest.get("bug_url", "")
+        self._os_release_text = (
+            f'NAME="{name}"\n'
+            f'VERSION="{version}"\n'
+            f'ID="{os_id}"\n'
+            f'ID_LIKE="rhel centos fedora"\n'
+            f'VERSION_ID="{version}"\n'
+            f'PRETTY_NAME="{name} {version}"\n'
+            f'ANSI_COLOR="0;31"\n'
+            f'CPE_NAME="cpe:/o:{os_id}:{os_id}:{version}"\n'
+            f'HOME_URL="{bug_url}"\n'
+            f'BUG_REPORT_URL="{bug_url}"\n'
+        )
+        self._release_line = f"{name} release {version}\n"
+        self._motd_bar = "─" * (len(name) + len(version) + 14)
+        self._motd_text = f"\n  Welcome to {name} {version}\n  {self._motd_bar}\n\n"
+        self._issue_text = f"{name} {version}\nKernel \\r on an \\m\n\n"
+        self._treeinfo_repl = {
+            "family": f"family = {name}",
+            "name": f"name = {name} {version}",
+            "short": f"short = {self.os_id}",
+            "version": f"version = {version}",
+        }
+
     def _detect_original_volume_id(self):
         """Detect the original ISO volume label from boot config files."""
         # Check grub.cfg for LABEL= reference
         grub_cfg = self.iso_root / "EFI" / "BOOT" / "grub.cfg"
         if grub_cfg.exists():
-            content = grub_cfg.read_text()
+            content = self._config_cache[grub_cfg] = _read_text(grub_cfg)
             # Match: hd:LABEL=CentOS-Stream-9-BaseOS-x86_64
-            match = re.search(r"hd:LABEL=(\S+)", content)
+            match = _RE_LABEL_HD.search(content)
             if match:
                 return match.group(1)
             # Match: search ... -l 'VOLUME-ID'
-            match = re.search(r"-l\s+'([^']+)'", content)
+            match = _RE_LABEL_SEARCH.search(content)
             if match:
                 return match.group(1)
 
         # Check isolinux.cfg
         isolinux_cfg = self.iso_root / "isolinux" / "isolinux.cfg"
         if isolinux_cfg.exists():
-            content = isolinux_cfg.read_text()
-            match = re.search(r"hd:LABEL=(\S+)", content)
+            content = self._config_cache[isolinux_cfg] = _read_text(isolinux_cfg)
+            match = _RE_LABEL_HD.search(content)
             if match:
                 return match.group(1)
 
         return None
 
-    def apply_all(self):
-        """Apply all branding modifications."""
-        print("⚙️  Applying branding...")
+    def apply_all(self, flush=True):
+        """
+        Apply all branding modifications. With flush=False the progress
+        report is left queued for the caller's flush_report() (used when
+        another engine runs alongside, so their output doesn't interleave).
+        """
+        self._log("⚙️  Applying branding...")
 
         if self.original_volume_id:
-            print(f"  → Original volume ID: {self.original_volume_id}")
-            print(f"  → New volume ID:      {self.new_volume_id}")
+            self._log(f"  → Original volume ID: {self.original_volume_id}")
+            self._log(f"  → New volume ID:      {self.new_volume_id}")
+
+        # The boot config / metadata patches and the release-file staging
+        # touch disjoint files and are I/O-bound, so run them concurrently.
+        # Asset copying can overwrite files in EFI/BOOT (next to grub.cfg),
+        # so it runs after the patches.
+        steps = [
+            self._patch_grub_config,
+            self._patch_isolinux_config,
+            self._patch_grub_conf_legacy,
+            self._patch_boot_msg,
+            self._patch_treeinfo,
+            self._patch_discinfo,
+            self._create_release_files,
+        ]
+        try:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                list(pool.map(lambda step: step(), steps))
 
-        self._patch_grub_config()
-        self._patch_isolinux_config()
-        self._patch_grub_conf_legacy()
-        self._patch_boot_msg()
-        self._patch_treeinfo()
-        self._patch_discinfo()
-        self._copy_branding_assets()
-        self._create_release_files()
+            self._copy_branding_assets()
 
-        print("  ✅ Branding applied")
+            self._log("  ✅ Branding applied")
+        finally:
+            if flush:
+                self.flush_report()
 
-    def _replace_distro_name(self, text, context=""):
-        """Replace any known upstream distro name with the new name."""
-        for pattern in self.UPSTREAM_PATTERNS:
-            text = re.sub(pattern, self.name, text, flags=re.IGNORECASE)
+    def _read_config(self, path):
+        """Read a boot config, reusing the copy read during volume ID detection."""
+        content = self._config_cache.pop(path, None)
+        return content if content is not None else _read_text(path)
 
-        # Also catch standalone references like "CentOS Stream" without version
-        text = re.sub(r"CentOS\s+Stream(?!\s*\d)", self.name, text, flags=re.IGNORECASE)
-        text = re.sub(r"CentOS(?!\s*Stream)(?!\s*-)", self.name, text, flags=re.IGNORECASE)
-        text = re.sub(r"Red\s+Hat\s+Enterprise\s+Linux", self.name, text, flags=re.IGNORECASE)
+    def _log(self, msg):
+        """Queue a progress line; safe to call from the patch workers."""
+        self._report.append(msg)
 
-        return text
+    def flush_report(self):
+        """Emit the queued progress lines in a single write."""
+        if self._report:
+            sys.stdout.write("\n".join(self._report) + "\n")
+            sys.stdout.flush()
+            self._report.clear()
 
-    def _replace_volume_label(self, text):
-        """Replace the original volume label with the new one in boot params."""
-        if not self.original_volume_id:
+    def _replace_distro_name(self, text, context=""):
+        """Replace any known upstream distro name with the new name."""
+        lower = text.lower()
+        if not any(k in lower for k in self.UPSTREAM_KEYWORDS):
             return text
-
-        # Replace hd:LABEL=OLD_LABEL with hd:LABEL=NEW_LABEL
-        text = text.replace(
-            f"hd:LABEL={self.original_volume_id}",
-            f"hd:LABEL={self.new_volume_id}"
-        )
-
-        # Replace search -l 'OLD_LABEL' with search -l 'NEW_LABEL'
-        text = text.replace(
-            f"'{self.original_volume_id}'",
-            f"'{self.new_volume_id}'"
-        )
-
-        return text
+        name = self.name
+        return self.UPSTREAM_RE.sub(lambda m: name, text)
 
     def _patch_grub_config(self):
         """Modify GRUB2 EFI boot menu entries."""
@@ -137,30 +296,17 @@ class BrandingEngine:
                     grub_cfg = alt_path
                     break
             else:
-                print("  ⚠️  No GRUB config found, skipping")
+                self._log("  ⚠️  No GRUB config found, skipping")
                 return
 
-        content = grub_cfg.read_text()
-
-        # Replace volume label references (CRITICAL for boot)
-        content = self._replace_volume_label(content)
+        original = self._read_config(grub_cfg)
 
-        # Replace distro names in menu entries
-        content = self._replace_distro_name(content, context="grub.cfg")
+        # Volume label (CRITICAL for boot), distro names in menu entries,
+        # "Rescue a CentOS Stream system" and timeout — all in one pass
+        content = _sub_fused(self._grub_re, self._grub_repl, original)
 
-        # Handle "Rescue a CentOS Stream system"
-        content = re.sub(
-            r"Rescue a\s+\S+(?:\s+\S+)?\s+system",
-            f"Rescue a {self.name} system",
-            content, flags=re.IGNORECASE
-        )
-
-        # Update timeout
-        boot_timeout = self.manifest.get("boot_timeout", 60)
-        content = re.sub(r"set timeout=\d+", f"set timeout={boot_timeout}", content)
-
-        grub_cfg.write_text(content)
-        print("  → EFI/BOOT/grub.cfg patched")
+        if _write_if_changed(grub_cfg, original, content):
+            self._log("  → EFI/BOOT/grub.cfg patched")
 
     def _patch_isolinux_config(self):
         """Modify isolinux/syslinux boot menu (BIOS boot)."""
@@ -169,39 +315,17 @@ class BrandingEngine:
             if not cfg_path.exists():
                 continue
 
-            content = cfg_path.read_text()
-
-            # Replace volume label references (CRITICAL for boot)
-            content = self._replace_volume_label(content)
+            original = self._read_config(cfg_path)
 
-            # Replace menu title
-            content = re.sub(
-                r"menu title .*",
-                f"menu title {self.name} {self.version}",
-                content, flags=re.IGNORECASE
-            )
+            # Volume label (CRITICAL for boot), menu title, distro names
+            # and help text — all in one pass
+            content = _sub_fused(self._isolinux_re, self._isolinux_repl, original)
 
-            # Replace all distro name references
-            content = self._replace_distro_name(content, context="isolinux.cfg")
+            # Timeout
+            content = _set_isolinux_timeout(content, self._isolinux_timeout)
 
-            # Handle help text references
-            content = re.sub(
-                r"Rescue a\s+\S+(?:\s+\S+)?\s+system",
-                f"Rescue a {self.name} system",
-                content, flags=re.IGNORECASE
-            )
-            content = re.sub(
-                r"installing\s*\n\s*CentOS\s+Stream\s*\d*",
-                f"installing\n\t{self.name}",
-                content, flags=re.IGNORECASE
-            )
-
-            # Timeout (isolinux uses tenths of seconds)
-            boot_timeout = self.manifest.get("boot_timeout", 60)
-            content = re.sub(r"^timeout \d+", f"timeout {boot_timeout}0", content, flags=re.MULTILINE)
-
-            cfg_path.write_text(content)
-            print(f"  → isolinux/{cfg_name} patched")
+            if _write_if_changed(cfg_path, original, content):
+                self._log(f"  → isolinux/{cfg_name} patched")
 
     def _patch_grub_conf_legacy(self):
         """Modify legacy grub.conf (isolinux/grub.conf)."""
@@ -209,15 +333,13 @@ class BrandingEngine:
         if not grub_conf.exists():
             return
 
-        content = grub_conf.read_text()
-        content = self._replace_distro_name(content, context="grub.conf")
+        original = grub_conf.read_text()
 
-        # Update timeout
-        boot_timeout = self.manifest.get("boot_timeout", 60)
-        content = re.sub(r"timeout \d+", f"timeout {boot_timeout}", content)
+        # Distro names and timeout in one pass
+        content = _sub_fused(self.LEGACY_GRUB_RE, self._legacy_grub_repl, original)
 
-        grub_conf.write_text(content)
-        print("  → isolinux/grub.conf patched")
+        if _write_if_changed(grub_conf, original, content):
+            self._log("  → isolinux/grub.conf patched")
 
     def _patch_boot_msg(self):
         """Modify isolinux boot message."""
@@ -225,10 +347,10 @@ class BrandingEngine:
         if not boot_msg.exists():
             return
 
-        content = boot_msg.read_text()
-        content = self._replace_distro_name(content, context="boot.msg")
-        boot_msg.write_text(content)
-        print("  → isolinux/boot.msg patched")
+        original = boot_msg.read_text()
+        content = self._replace_distro_name(original, context="boot.msg")
+        if _write_if_changed(boot_msg, original, content):
+            self._log("  → isolinux/boot.msg patched")
 
     def _patch_treeinfo(self):
         """Update .treeinfo metadata file (DVD ISOs only)."""
@@ -237,15 +359,38 @@ class BrandingEngine:
             # Boot ISOs don't have .treeinfo — this is normal
             return
 
-        content = treeinfo.read_text()
-
-        content = re.sub(r"family = .*", f"family = {self.name}", content)
-        content = re.sub(r"name = .*", f"name = {self.name} {self.version}", content)
-        content = re.sub(r"short = .*", f"short = {self.os_id}", content)
-        content = re.sub(r"version = .*", f"version = {self.version}", content)
-
-        treeinfo.write_text(content)
-        print("  → .treeinfo patched")
+        original = content = _read_text(treeinfo)
+
+        # .treeinfo is INI — parse once and set the keys directly.
+        # Fall back to the regex rewrite if it doesn't parse.
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.optionxform = str
+        try:
+            parser.read_string(content)
+        except configparser.Error:
+            parser = None
+
+        if parser is not None and parser.has_section("general"):
+            parser["general"].update({
+                "family": self.name,
+                "name": f"{self.name} {self.version}",
+                "short": self.os_id,
+                "version": self.version,
+            })
+            if parser.has_section("release"):
+                parser["release"].update({
+                    "name": self.name,
+                    "short": self.os_id,
+                    "version": self.version,
+                })
+            buf = io.StringIO()
+            parser.write(buf)
+            content = buf.getvalue().rstrip("\n") + "\n"
+        else:
+            content = _sub_fused(self.TREEINFO_RE, self._treeinfo_repl, content)
+
+        if _write_if_changed(treeinfo, original, content):
+            self._log("  → .treeinfo patched")
 
     def _patch_discinfo(self):
         """
@@ -256,8 +401,8 @@ class BrandingEngine:
         if not discinfo.exists():
             return
 
-        content = discinfo.read_text().strip()
-        lines = content.splitlines()
+        original = discinfo.read_text()
+        lines = original.strip().splitlines()
 
         # .discinfo format:
         # 1770004599.657164       ← timestamp (keep)
@@ -266,8 +411,8 @@ class BrandingEngine:
         if len(lines) >= 2:
             lines[1] = self.version
 
-        discinfo.write_text("\n".join(lines) + "\n")
-        print("  → .discinfo patched")
+        if _write_if_changed(discinfo, original, "\n".join(lines) + "\n"):
+            self._log("  → .discinfo patched")
 
     def _copy_branding_assets(self):
         """Copy custom branding assets if provided."""
@@ -277,7 +422,7 @@ class BrandingEngine:
 
         assets_path = Path(assets_dir)
         if not assets_path.is_dir():
-            print(f"  ⚠️  Assets directory not found: {assets_dir}")
+            self._log(f"  ⚠️  Assets directory not found: {assets_dir}")
             return
 
         # GRUB theme files
@@ -285,10 +430,11 @@ class BrandingEngine:
         if grub_src.is_dir():
             grub_dst = self.iso_root / "EFI" / "BOOT"
             grub_dst.mkdir(parents=True, exist_ok=True)
-            for f in grub_src.iterdir():
-                if f.is_file():
-                    shutil.copy2(f, grub_dst / f.name)
-            print("  → GRUB assets copied")
+            with os.scandir(grub_src) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        fast_copy(entry.path, grub_dst / entry.name)
+            self._log("  → GRUB assets copied")
 
         # Splash image for isolinux
         splash_candidates = [
@@ -298,15 +444,15 @@ class BrandingEngine:
         for splash in splash_candidates:
             if splash.exists():
                 dst = self.iso_root / "isolinux" / "splash.png"
-                shutil.copy2(splash, dst)
-                print("  → isolinux/splash.png replaced")
+                fast_copy(splash, dst)
+                self._log("  → isolinux/splash.png replaced")
                 break
 
         # Plymouth (staged for kickstart %post)
         plymouth_src = assets_path / "plymouth"
         if plymouth_src.is_dir():
             self._plymouth_assets = plymouth_src
-            print("  → Plymouth assets staged (applied during install)")
+            self._log("  → Plymouth assets staged (applied during install)")
 
         # Anaconda (installer branding → product.img)
         anaconda_src = assets_path / "anaconda"
@@ -317,7 +463,7 @@ class BrandingEngine:
         logos_src = assets_path / "logos"
         if logos_src.is_dir():
             self._logos_path = logos_src
-            print("  → Logos staged for RPM packaging")
+            self._log("  → Logos staged for RPM packaging")
 
     def _create_product_img(self, anaconda_src: Path):
         """
@@ -325,15 +471,19 @@ class BrandingEngine:
         This is overlaid on the installer's filesystem at boot.
         """
         product_dir = self.iso_root / "_product_staging"
-        product_dir.mkdir(parents=True, exist_ok=True)
 
         # Anaconda branding lives in /usr/share/anaconda/pixmaps/
+        # (creating the leaf directories also creates product_dir)
         pyanaconda_dir = product_dir / "usr" / "share" / "anaconda" / "pixmaps"
         pyanaconda_dir.mkdir(parents=True, exist_ok=True)
 
-        for f in anaconda_src.iterdir():
-            if f.is_file() and not f.name.startswith(".") and f.name != "README.md":
-                shutil.copy2(f, pyanaconda_dir / f.name)
+        # Staged files are only read by mksquashfs/cpio, so hardlink them
+        # (must not be modified in place — they share the asset inodes)
+        with os.scandir(anaconda_src) as entries:
+            for entry in entries:
+                if (entry.is_file() and not entry.name.startswith(".")
+                        and entry.name != "README.md"):
+                    link_or_copy(entry.path, pyanaconda_dir / entry.name)
 
         # Create .buildstamp — tells Anaconda the product name
         buildstamp_dir = product_dir / "run" / "install" / "product"
@@ -348,7 +498,7 @@ class BrandingEngine:
         )
 
         self._product_staging = product_dir
-        print("  → Anaconda branding staged for product.img")
+        self._log("  → Anaconda branding staged for product.img")
 
     def _create_release_files(self):
         """
@@ -359,39 +509,17 @@ class BrandingEngine:
         release_dir.mkdir(parents=True, exist_ok=True)
 
         # /etc/os-release
-        os_release = release_dir / "os-release"
-        os_release.write_text(
-            f'NAME="{self.name}"\n'
-            f'VERSION="{self.version}"\n'
-            f'ID="{self.os_id}"\n'
-            f'ID_LIKE="rhel centos fedora"\n'
-            f'VERSION_ID="{self.version}"\n'
-            f'PRETTY_NAME="{self.name} {self.version}"\n'
-            f'ANSI_COLOR="0;31"\n'
-            f'CPE_NAME="cpe:/o:{self.os_id}:{self.os_id}:{self.version}"\n'
-            f'HOME_URL="{self.manifest.get("bug_url", "")}"\n'
-            f'BUG_REPORT_URL="{self.manifest.get("bug_url", "")}"\n'
-        )
+        (release_dir / "os-release").write_text(self._os_release_text)
 
         # /etc/redhat-release & /etc/system-release
         for fname in [f"{self.os_id}-release", "system-release"]:
-            (release_dir / fname).write_text(
-                f"{self.name} release {self.version}\n"
-            )
+            (release_dir / fname).write_text(self._release_line)
 
         # /etc/motd
-        (release_dir / "motd").write_text(
-            f"\n"
-            f"  Welcome to {self.name} {self.version}\n"
-            f"  {'─' * (len(self.name) + len(self.version) + 14)}\n"
-            f"\n"
-        )
+        (release_dir / "motd").write_text(self._motd_text)
 
         # /etc/issue & /etc/issue.net
-        (release_dir / "issue").write_text(
-            f"{self.name} {self.version}\n"
-            f"Kernel \\r on an \\m\n\n"
-        )
+        (release_dir / "issue").write_text(self._issue_text)
 
         self._release_staging = release_dir
-        print("  → Release files staged")
+        self._log("  → Release files staged")
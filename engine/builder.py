@@ -4,17 +4,116 @@ Coordinates all engines: ISO → Branding → Packages → Kickstart → Repack.
 """
 
 import os
+import stat
+import errno
+import logging
 import shutil
+import hashlib
 import tempfile
 import subprocess
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 from engine.iso import ISOEngine
 from engine.branding import BrandingEngine
-from engine.packages import PackageEngine
+from engine.packages import PackageEngine, scan_local_rpms
 from engine.kickstart import KickstartEngine
 from engine.gui import GUIEngine
+from engine.fsutil import discard_tree, fast_copy, stream_digests, which
+
+# python-isal's igzip is a drop-in gzip with SIMD DEFLATE (several times
+# faster); use it for the cpio product.img when it's installed.
+try:
+    from isal import igzip as _gzip
+    _GZIP_LEVEL = 1
+except ImportError:
+    import gzip as _gzip
+    _GZIP_LEVEL = 6
+
+logger = logging.getLogger("distro_forge.builder")
+
+# hashlib's OpenSSL backend uses SHA-NI / ARMv8 crypto extensions; the
+# builtin fallback (Python built without OpenSSL) is several times slower
+_OPENSSL_SHA256 = hashlib.sha256.__module__ == "_hashlib"
+
+# Scratch space the work dir needs beyond the extracted ISO (staging,
+# product.img, rewritten repodata)
+_WORK_HEADROOM = 512 * 2**20
+
+
+def _free_bytes(path) -> int:
+    """Space available to unprivileged writers on path's filesystem."""
+    vfs = os.statvfs(path)
+    return vfs.f_bavail * vfs.f_frsize
+
+
+def _check_free_space(path, needed: int):
+    """Raise ENOSPC if path's filesystem has less than `needed` bytes free."""
+    free = _free_bytes(path)
+    if free < needed:
+        raise OSError(
+            errno.ENOSPC,
+            f"Not enough space in {path}: "
+            f"{free // 2**20} MiB free, ~{needed // 2**20} MiB needed"
+        )
+
+
+@lru_cache(maxsize=32)
+def _iso_fingerprint(path: str, mtime_ns: int, size: int) -> str:
+    """Cache key for an ISO; a pure function of its path, mtime and size."""
+    return hashlib.sha256(f"{path}\0{size}\0{mtime_ns}".encode()).hexdigest()[:16]
+
+
+def _cpio_entry(out, ino, name, st, data=b""):
+    """Write one newc cpio record (header, padded name, padded data)."""
+    name_b = name.encode() + b"\0"
+    fields = (
+        ino, st.st_mode if st else 0, 0, 0,
+        st.st_nlink if st and stat.S_ISDIR(st.st_mode) else 1,
+        int(st.st_mtime) if st else 0, len(data),
+        0, 0, 0, 0, len(name_b), 0,
+    )
+    out.write(b"070701" + b"".join(b"%08X" % f for f in fields))
+    out.write(name_b + b"\0" * (-(110 + len(name_b)) % 4))
+    if data:
+        out.write(data + b"\0" * (-len(data) % 4))
+
+
+def _walk(root):
+    """
+    Yield DirEntry objects under root, depth-first in name order.
+    Uses the d_type from the directory read, so no stat per entry.
+    """
+    with os.scandir(root) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for e in entries:
+        yield e
+        if e.is_dir(follow_symlinks=False):
+            yield from _walk(e.path)
+
+
+def _write_cpio_gz(src_dir: Path, dest: Path):
+    """
+    Archive src_dir as a gzip'd newc cpio (what `find . | cpio -o -H newc
+    | gzip` produces), without spawning a shell or any helper processes.
+    Entries are sorted (reproducible) and owned by root, as Anaconda
+    expects for an overlay.
+    """
+    with _gzip.open(dest, "wb", compresslevel=_GZIP_LEVEL) as out:
+        _cpio_entry(out, 1, ".", os.lstat(src_dir))
+        for ino, e in enumerate(_walk(src_dir), 2):
+            st = e.stat(follow_symlinks=False)
+            if e.is_file(follow_symlinks=False):
+                with open(e.path, "rb") as f:
+                    data = f.read()
+            elif e.is_symlink():
+                data = os.readlink(e.path).encode()
+            else:
+                data = b""
+            _cpio_entry(out, ino, os.path.relpath(e.path, src_dir), st, data)
+        _cpio_entry(out, 0, "TRAILER!!!", None)
 
 
 class Builder:
@@ -25,32 +124,112 @@ class Builder:
         self.output_dir = output_dir
         self.name = manifest["name"]
         self.version = manifest["version"]
-        self.os_id = manifest.get("branding", {}).get(
-            "os_id", self.name.lower().replace(" ", "-")
-        )
+        # Concurrency for independent pipeline steps (1 = fully serial)
+        self.jobs = manifest.get("jobs", 2)
+
+        # Fail fast on bad inputs, before reserving any temp space
+        work_root = self._preflight()
 
         # Work directory — temp space for ISO manipulation
-        self.work_dir = Path(tempfile.mkdtemp(prefix="distro-forge-"))
+        self.work_dir = Path(tempfile.mkdtemp(
+            prefix="distro-forge-", dir=work_root
+        ))
+
+    def _preflight(self):
+        """
+        Validate inputs that would otherwise only fail deep inside the
+        pipeline (after minutes of extract/branding work).
+        """
+        base_iso = Path(self.manifest["base_iso"])
+        if not base_iso.is_file():
+            raise FileNotFoundError(f"Base ISO not found: {base_iso}")
+
+        if not os.access(self.output_dir, os.W_OK):
+            raise PermissionError(f"Output directory not writable: {self.output_dir}")
+
+        # The repacked ISO is about the size of the base ISO, and so is
+        # the extracted tree in the work dir
+        iso_size = base_iso.stat().st_size
+        _check_free_space(self.output_dir, iso_size)
+        work_root = self._work_root()
+        _check_free_space(work_root or tempfile.gettempdir(), iso_size)
+
+        # Extraction can fall back to mount/7z, but repacking needs xorriso
+        if not which("xorriso"):
+            raise RuntimeError(
+                "xorriso not found (needed to repack the ISO). "
+                "Install it: brew/dnf install xorriso"
+            )
+
+        return work_root
+
+    def _work_root(self):
+        """
+        Pick where the work dir goes: `work_dir` from the manifest if set,
+        else RAM-backed /dev/shm when the ISO fits comfortably both in free
+        memory and in the tmpfs itself (containers often cap it at 64 MB),
+        else disk-backed /var/tmp (large extracts would churn tmpfs).
+        """
+        if self.manifest.get("work_dir"):
+            return self.manifest["work_dir"]
+        try:
+            iso_size = Path(self.manifest["base_iso"]).stat().st_size
+            avail = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            return None  # tempfile's default
+        try:
+            shm_free = _free_bytes("/dev/shm")
+        except OSError:
+            shm_free = 0  # no /dev/shm
+        if (iso_size < avail // 4 and iso_size + _WORK_HEADROOM < shm_free
+                and os.access("/dev/shm", os.W_OK)):
+            return "/dev/shm"
+        return "/var/tmp" if os.access("/var/tmp", os.W_OK) else None
 
     def run(self):
         """Execute the full build pipeline."""
-        print(f"\n{'═' * 50}")
-        print(f"  Building {self.name} {self.version}")
-        print(f"  Work dir: {self.work_dir}")
-        print(f"{'═' * 50}\n")
+        rule = "═" * 50
+        logger.info("\n%s\n  Building %s %s\n  Work dir: %s\n%s\n",
+                    rule, self.name, self.version, self.work_dir, rule)
 
+        succeeded = False
         try:
             # ── Step 1: Extract ISO ─────────────────────────
+            # The local RPM scan doesn't need the ISO, so it runs
+            # alongside the (disk-bound) extract. `jobs: 1` serializes.
             iso_engine = ISOEngine(self.manifest["base_iso"], self.work_dir)
-            iso_root = iso_engine.extract()
+            local_rpms = self.manifest.get("packages", {}).get("local_rpms")
+            if local_rpms and self.jobs > 1:
+                with ThreadPoolExecutor(max_workers=1) as pool:
+                    f_rpms = pool.submit(scan_local_rpms, local_rpms)
+                    iso_root = self._extract_iso(iso_engine)
+                    local_rpm_files = f_rpms.result()
+            else:
+                iso_root = self._extract_iso(iso_engine)
+                local_rpm_files = None
 
             # ── Step 2: Apply Branding ──────────────────────
-            branding_engine = BrandingEngine(iso_root, self.manifest)
-            branding_engine.apply_all()
-
             # ── Step 3: Handle Packages ─────────────────────
-            pkg_engine = PackageEngine(iso_root, self.manifest)
-            pkg_engine.apply_all()
+            # These touch disjoint parts of iso_root (boot configs,
+            # metadata and staging vs. Packages/ and repodata/), so
+            # they run side by side. Keep it that way when adding steps.
+            branding_engine = BrandingEngine(iso_root, self.manifest)
+            pkg_engine = PackageEngine(iso_root, self.manifest, local_rpm_files)
+            if self.jobs > 1:
+                # Both engines queue their output; it's emitted after the
+                # join, one engine at a time, so lines never interleave
+                try:
+                    with ThreadPoolExecutor(max_workers=2) as pool:
+                        steps = [pool.submit(branding_engine.apply_all, False),
+                                 pool.submit(pkg_engine.apply_all, False)]
+                        for step in steps:
+                            step.result()
+                finally:
+                    branding_engine.flush_report()
+                    pkg_engine.flush_report()
+            else:
+                branding_engine.apply_all()
+                pkg_engine.apply_all()
 
             # ── Step 4: GUI Configuration ───────────────────
             gui_engine = GUIEngine(self.manifest)
@@ -79,22 +258,84 @@ class Builder:
             # ── Step 8: Generate checksum ───────────────────
             self._generate_checksums(output_path)
 
+            succeeded = True
             return output_path
 
         except Exception as e:
-            print(f"\n❌ Build failed at: {e}")
+            logger.error("\n❌ Build failed at: %s", e)
             raise
 
         finally:
             # ── Cleanup ─────────────────────────────────────
-            print("\n⚙️  Cleaning up...")
+            logger.info("\n⚙️  Cleaning up...")
             try:
                 iso_engine.cleanup()
             except Exception:
                 pass
-            # Keep work dir for debugging? Make configurable later.
-            print(f"  → Work dir preserved: {self.work_dir}")
-            print(f"    (delete manually when done: rm -rf {self.work_dir})")
+            # Failed builds (and `preserve_work_dir: true`) keep the work
+            # dir for debugging; otherwise it's deleted in the background
+            mounted = (self.work_dir / "mnt").is_mount()
+            if succeeded and not mounted and not self.manifest.get("preserve_work_dir"):
+                discard_tree(self.work_dir, self.work_dir.parent)
+            else:
+                logger.info("  → Work dir preserved: %s\n"
+                            "    (delete manually when done: rm -rf %s)",
+                            self.work_dir, self.work_dir)
+
+    def _extract_cache_dir(self) -> Path:
+        """Cache slot for the base ISO, keyed on its path, size and mtime."""
+        iso = Path(self.manifest["base_iso"]).resolve()
+        st = iso.stat()
+        key = _iso_fingerprint(str(iso), st.st_mtime_ns, st.st_size)
+        cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        # Own subdirectory: eviction clears every sibling of this slot
+        return Path(cache_home) / "distro-forge" / "extract" / key
+
+    def _extract_iso(self, iso_engine: ISOEngine) -> Path:
+        """
+        Extract the base ISO, reusing a cached extract of the same ISO
+        when `extract_cache: true` is set in the manifest (off by default:
+        the cache costs a full extract's worth of disk per ISO).
+        Only the pristine tree is cached: later steps edit files in place,
+        so it is copied (not hardlinked) in and out of the cache. Only the
+        newest ISO's extract is kept.
+        """
+        if not self.manifest.get("extract_cache", False):
+            return iso_engine.extract()
+
+        cache_dir = self._extract_cache_dir()
+        cached_root = cache_dir / "iso_root"
+        marker = cache_dir / "iso_root.marker"
+
+        if marker.exists():
+            logger.info("⚙️  Extracting ISO (cached)...")
+            shutil.copytree(cached_root, iso_engine.extract_dir,
+                            symlinks=True, copy_function=fast_copy)
+            iso_engine.volume_id = marker.read_text().strip() or None
+            logger.info("  ✅ Extracted to %s", iso_engine.extract_dir)
+            return iso_engine.extract_dir
+
+        iso_root = iso_engine.extract()
+        try:
+            self._evict_extract_cache(cache_dir)
+            shutil.rmtree(cached_root, ignore_errors=True)
+            shutil.copytree(iso_root, cached_root,
+                            symlinks=True, copy_function=fast_copy)
+            # Marker goes last so a half-written cache is never reused
+            marker.write_text(f"{iso_engine.volume_id or ''}\n")
+            logger.info("  → Extract cached in %s", cache_dir)
+        except OSError as e:
+            logger.warning("  ⚠️  Could not cache extract: %s", e)
+        return iso_root
+
+    @staticmethod
+    def _evict_extract_cache(keep: Path):
+        """Drop every cached extract except `keep` (one ISO's worth at most)."""
+        keep.mkdir(parents=True, exist_ok=True)
+        for entry in os.scandir(keep.parent):
+            if (entry.is_dir(follow_symlinks=False) and entry.path != str(keep)
+                    and not entry.name.startswith(".gc-")):
+                discard_tree(Path(entry.path), keep.parent)
 
     def _create_product_img(self, iso_root: Path, branding_engine: BrandingEngine):
         """
@@ -108,59 +349,64 @@ class Builder:
         product_img = iso_root / "images" / "product.img"
         product_img.parent.mkdir(parents=True, exist_ok=True)
 
-        print("⚙️  Creating product.img...")
+        logger.info("⚙️  Creating product.img...")
 
         # Try creating with mksquashfs
-        if shutil.which("mksquashfs"):
+        if which("mksquashfs"):
+            cmd = ["mksquashfs", str(staging_dir), str(product_img),
+                   "-noappend", "-no-progress", "-no-xattrs", "-all-root",
+                   "-processors", str(os.cpu_count() or 2)]
+            # Compressor is opt-in: the installer kernel must support it
+            comp = self.manifest.get("squashfs_comp")
+            if comp:
+                cmd += ["-comp", comp]
+                if comp in ("gzip", "zstd") and self.manifest.get("squashfs_level"):
+                    cmd += ["-Xcompression-level", str(self.manifest["squashfs_level"])]
+            # Reproducible timestamps (honoured by squashfs-tools >= 4.4)
+            env = dict(os.environ, SOURCE_DATE_EPOCH="0")
             try:
+                # stdout is a per-inode log; only stderr is worth keeping
                 subprocess.run(
-                    ["mksquashfs", str(staging_dir), str(product_img),
-                     "-noappend", "-no-progress"],
-                    capture_output=True, text=True, check=True
+                    cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                    text=True, check=True, env=env
                 )
-                print("  → product.img created (squashfs)")
+                logger.info("  → product.img created (squashfs)")
             except subprocess.CalledProcessError as e:
-                print(f"  ⚠️  mksquashfs failed: {e.stderr[:200]}")
+                logger.warning("  ⚠️  mksquashfs failed: %.200s", e.stderr)
         else:
-            # Fall back to cpio archive
+            # Fall back to a gzip'd cpio archive, written in-process
             try:
-                result = subprocess.run(
-                    ["bash", "-c",
-                     f"cd {staging_dir} && find . | cpio -o -H newc | gzip > {product_img}"],
-                    capture_output=True, text=True, check=True
-                )
-                print("  → product.img created (cpio)")
-            except subprocess.CalledProcessError as e:
-                print(f"  ⚠️  product.img creation failed: {e.stderr[:200]}")
+                _write_cpio_gz(staging_dir, product_img)
+                logger.info("  → product.img created (cpio)")
+            except OSError as e:
+                logger.warning("  ⚠️  product.img creation failed: %s", e)
 
-        # Cleanup staging
-        shutil.rmtree(staging_dir, ignore_errors=True)
+        # Cleanup staging — moved out of iso_root before the repack,
+        # deleted in the background
+        discard_tree(staging_dir, self.work_dir)
 
         # Also clean release staging
         release_staging = iso_root / "_release_staging"
         if release_staging.exists():
-            shutil.rmtree(release_staging, ignore_errors=True)
+            discard_tree(release_staging, self.work_dir)
 
     def _generate_checksums(self, iso_path: Path):
-        """Generate SHA256 checksum file."""
-        print("⚙️  Generating checksums...")
+        """
+        Generate checksum files (SHA256 by default; more via the manifest's
+        `checksums` list, e.g. [sha256, sha512]) from one read of the ISO.
+        """
+        logger.info("⚙️  Generating checksums...")
 
-        if shutil.which("sha256sum"):
-            cmd = "sha256sum"
-        elif shutil.which("shasum"):
-            cmd = "shasum -a 256"
-        else:
-            print("  ⚠️  No checksum tool found, skipping")
-            return
+        if not _OPENSSL_SHA256:
+            logger.warning("  ⚠️  Python's hashlib lacks OpenSSL; checksumming will be slow")
 
-        checksum_file = iso_path.with_suffix(".iso.sha256")
+        algos = self.manifest.get("checksums") or ["sha256"]
         try:
-            result = subprocess.run(
-                f"{cmd} {iso_path}",
-                shell=True, capture_output=True, text=True
-            )
-            if result.returncode == 0:
-                checksum_file.write_text(result.stdout)
-                print(f"  → Checksum: {checksum_file}")
-        except Exception:
-            print("  ⚠️  Checksum generation failed")
+            digests = stream_digests(iso_path, algos)
+            for algo in algos:
+                checksum_file = iso_path.with_suffix(f".iso.{algo}")
+                # Same layout as sha256sum & co., so `<algo>sum -c` works
+                checksum_file.write_text(f"{digests[algo]}  {iso_path.name}\n")
+                logger.info("  → Checksum: %s", checksum_file)
+        except (OSError, ValueError) as e:
+            logger.warning("  ⚠️  Checksum generation failed: %s", e)
@@ -5,12 +5,280 @@ repos and composes a fresh ISO with your branding and package selection.
 """
 
 import os
+import sys
+import errno
 import json
-import shutil
+import signal
+import threading
 import subprocess
 import tempfile
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ET
 from pathlib import Path
+from string import Template
 from datetime import datetime
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+from engine.fsutil import discard_tree, fast_copy, stream_digests, which
+from engine.gui import GUIEngine
+
+
+def _killpg(pid: int, sig: int):
+    """Signal a process group that may already have exited."""
+    try:
+        os.killpg(pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+# Parsed once at import; rendered with Template.substitute(), which raises
+# KeyError on a missing field instead of emitting a half-filled file
+_KICKSTART_TEMPLATE = Template("""# ${name} ${version} — Build System Kickstart
+# Generated by Distro Forge
+
+${display}
+
+lang ${lang}
+keyboard --vckeymap=${keyboard} --xlayouts='${keyboard}'
+timezone ${tz} --utc
+network --bootproto=dhcp --activate
+network --hostname=${os_id}
+
+${root_pw}
+
+selinux --${selinux}
+${firewall_line}
+
+ignoredisk --only-use=sda
+autopart --type=lvm
+clearpart --all --initlabel
+bootloader --append="crashkernel=auto" --location=mbr
+
+${repo_section}
+
+reboot --eject
+
+%packages
+${pkg_section}
+%end
+
+%post --log=/root/distro-forge-post.log
+echo '=== ${name} post-install ==='
+
+cat > /etc/os-release << 'EOF'
+NAME="${name}"
+VERSION="${version}"
+ID="${os_id}"
+ID_LIKE="rhel centos fedora"
+VERSION_ID="${version}"
+PRETTY_NAME="${name} ${version}"
+ANSI_COLOR="0;31"
+CPE_NAME="cpe:/o:${os_id}:${os_id}:${version}"
+EOF
+
+echo "${name} release ${version}" > /etc/system-release
+echo "${name} release ${version}" > /etc/redhat-release
+
+cat > /etc/motd << 'EOF'
+
+  Welcome to ${name} ${version}
+
+EOF
+
+echo '${name} installation complete.'
+%end
+""")
+
+_PUNGI_TEMPLATE = Template("""# Pungi config for ${name} ${version}
+# Generated by Distro Forge on ${generated}
+
+release_name = "${name}"
+release_short = "${os_id}"
+release_version = "${version}"
+release_is_layered = False
+
+bootable = True
+comps_file = "${comps_file}"
+
+arch = ["${arch}"]
+
+# ── Variants ──
+variants_file = "${variants_file}"
+
+# ── Signing ──
+sigkeys = [""]
+
+# ── Repos ──
+pkgset_source = "repos"
+pkgset_repos = {
+${repo_lines}}
+
+# ── Gather ──
+gather_method = "deps"
+gather_backend = "dnf"
+check_deps = False
+greedy_method = "build"
+
+# ── Create ISO ──
+createiso_skip = []
+create_optional_isos = False
+
+# ── Build install images ──
+buildinstall_method = "lorax"
+buildinstall_treeinfo_name = "${name}"
+
+# ── ISO naming ──
+image_name_format = "${name}-${version}-%(variant)s-%(arch)s-%(disc_type)s%(disc_num)s.iso"
+image_volid_formats = {
+    "boot": "${vol_id}-%(variant)s-%(arch)s-boot",
+    "dvd": "${vol_id}-%(variant)s-%(arch)s-dvd",
+}
+""")
+
+
+def _probe_repo(url):
+    """
+    HEAD a repo's repomd.xml; returns an error string, or None if reachable.
+    Servers that reject HEAD (405/501) get a one-byte ranged GET instead.
+    """
+    repomd = url.rstrip("/") + "/repodata/repomd.xml"
+    request = urllib.request.Request(repomd, method="HEAD")
+    try:
+        try:
+            with urllib.request.urlopen(request, timeout=5):
+                return None
+        except urllib.error.HTTPError as e:
+            if e.code not in (405, 501):
+                raise
+        request = urllib.request.Request(repomd, headers={"Range": "bytes=0-0"})
+        with urllib.request.urlopen(request, timeout=5):
+            return None
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        return f"{repomd}: {getattr(e, 'reason', e)}"
+
+
+# Mandatory members of the generated comps "core" group
+CORE_PACKAGES = (
+    "basesystem", "bash", "coreutils", "filesystem", "glibc",
+    "NetworkManager", "rpm", "dnf", "systemd",
+)
+
+
+def _xml_document(root, doctype=""):
+    """Serialize an element tree as a UTF-8 XML document."""
+    if hasattr(ET, "indent"):  # Python 3.9+
+        ET.indent(root, space="  ")
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n' + doctype
+        + ET.tostring(root, encoding="unicode") + "\n"
+    )
+
+
+def _comps_group(comps, group_id, name, description, packages):
+    """Append a default, user-visible comps <group> of mandatory packages."""
+    group = ET.SubElement(comps, "group")
+    for tag, text in (("id", group_id), ("name", name), ("description", description),
+                      ("default", "true"), ("uservisible", "true")):
+        ET.SubElement(group, tag).text = text
+    pkglist = ET.SubElement(group, "packagelist")
+    for pkg in packages:
+        ET.SubElement(pkglist, "packagereq", type="mandatory").text = pkg
+
+
+def _comps_environment(comps, env_id, name, description, order, group_ids):
+    """Append a comps <environment> made of the given groups."""
+    env = ET.SubElement(comps, "environment")
+    for tag, text in (("id", env_id), ("name", name), ("description", description),
+                      ("display_order", str(order))):
+        ET.SubElement(env, tag).text = text
+    grouplist = ET.SubElement(env, "grouplist")
+    for group_id in group_ids:
+        ET.SubElement(grouplist, "groupid").text = group_id
+
+
+def _variant(variants, variant_id, arch, groups):
+    """Append a pungi <variant> for one arch and set of groups."""
+    variant = ET.SubElement(variants, "variant", id=variant_id, name=variant_id, type="variant")
+    ET.SubElement(ET.SubElement(variant, "arches"), "arch").text = arch
+    group_list = ET.SubElement(variant, "groups")
+    for group in groups:
+        ET.SubElement(group_list, "group").text = group
+    return variant
+
+
+def _desktop_info(desktop):
+    """GUIEngine's group/package entry for a desktop, defaulting to GNOME."""
+    return GUIEngine.DESKTOP_PACKAGES.get(desktop, GUIEngine.DESKTOP_PACKAGES["gnome"])
+
+
+def _scan_tree(root):
+    """
+    Walk root top-down in os.walk order, yielding (dirpath, [DirEntry]).
+    Entry types come from the directory read (d_type), so unlike
+    os.walk nothing is stat'ed; callers can stop early.
+    """
+    stack = [str(root)]
+    while stack:
+        dirpath = stack.pop()
+        try:
+            with os.scandir(dirpath) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        yield dirpath, entries
+        stack.extend(reversed(
+            [e.path for e in entries if e.is_dir(follow_symlinks=False)]
+        ))
+
+
+@dataclass(frozen=True)
+class _BuildContext:
+    """Per-build values derived from the manifest once, in BuildSystem.__init__."""
+
+    __slots__ = (
+        "desktop", "desktop_group", "desktop_packages",
+        "install_pkgs", "remove_pkgs", "vol_id", "pungi_vol_id",
+    )
+
+    desktop: Optional[str]  # lowercase DE name; None when the GUI is off
+    desktop_group: Optional[str]  # comps group for the DE, e.g. "@gnome-desktop"
+    desktop_packages: Tuple[str, ...]
+    install_pkgs: Tuple[str, ...]
+    remove_pkgs: Tuple[str, ...]
+    vol_id: str  # lorax / xorriso volume ID (max 32 chars)
+    pungi_vol_id: str
+
+    @classmethod
+    def from_manifest(cls, manifest, name, version, arch):
+        gui = manifest.get("gui", {})
+        packages = manifest.get("packages", {})
+
+        for key in ("install", "remove"):
+            if not isinstance(packages.get(key) or [], list):
+                raise ValueError(f"packages.{key} must be a list")
+
+        desktop = desktop_group = None
+        desktop_packages = ()
+        if gui.get("enabled"):
+            desktop = (gui.get("desktop") or "GNOME").lower()
+            info = _desktop_info(desktop)
+            desktop_group = info["group"]
+            desktop_packages = tuple(info["packages"])
+
+        return cls(
+            desktop=desktop,
+            desktop_group=desktop_group,
+            desktop_packages=desktop_packages,
+            install_pkgs=tuple(packages.get("install") or ()),
+            remove_pkgs=tuple(packages.get("remove") or ()),
+            vol_id=f"{name}-{version}-{arch}"[:32],
+            pungi_vol_id=f"{name}-{version}"[:32],
+        )
 
 
 class BuildSystem:
@@ -28,6 +296,21 @@ class BuildSystem:
 
     SUPPORTED_ARCHES = ["x86_64", "aarch64"]
 
+    # Static xorriso argv pieces for _create_iso_from_tree
+    _XORRISO_PREFIX = ("xorriso", "-as", "mkisofs", "-R", "-J")
+    _ISOLINUX_ARGS = (
+        "-b", "isolinux/isolinux.bin",
+        "-c", "isolinux/boot.cat",
+        "-no-emul-boot",
+        "-boot-load-size", "4",
+        "-boot-info-table",
+    )
+    _EFI_ARGS = (
+        "-eltorito-alt-boot",
+        "-e", "images/efiboot.img",
+        "-no-emul-boot",
+    )
+
     # Upstream repo base URLs for known distros
     UPSTREAM_REPOS = {
         "centos-stream-9": {
@@ -55,6 +338,18 @@ class BuildSystem:
         },
     }
 
+    @classmethod
+    @lru_cache(maxsize=16)
+    def _resolved_repos(cls, upstream, arch):
+        """
+        UPSTREAM_REPOS[upstream] with $arch filled in, as (repo_id, url)
+        pairs (a tuple, since the cached value is shared). None if unknown.
+        """
+        repos = cls.UPSTREAM_REPOS.get(upstream)
+        if repos is None:
+            return None
+        return tuple((repo_id, url.replace("$arch", arch)) for repo_id, url in repos.items())
+
     def __init__(self, manifest: dict, output_dir: Path):
         self.manifest = manifest
         self.output_dir = output_dir
@@ -70,12 +365,18 @@ class BuildSystem:
         self.compose_tool = build_config.get("tool", "lorax")  # lorax or pungi
         self.release = build_config.get("release", self.version)
         self.mirror_locally = build_config.get("mirror", False)
+        self._ctx = _BuildContext.from_manifest(manifest, self.name, self.version, self.arch)
 
         self.work_dir = Path(tempfile.mkdtemp(prefix="distro-forge-build-"))
         self.compose_dir = self.work_dir / "compose"
         self.repo_dir = self.work_dir / "repos"
         self.ks_dir = self.work_dir / "kickstarts"
 
+        # Persistent DNF cache so repeated composes don't re-download
+        # repodata and packages (per upstream/arch to keep them apart)
+        cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        self.cache_dir = Path(cache_home) / "distro-forge" / "dnf" / f"{self.upstream}-{self.arch}"
+
     def check_environment(self):
         """Verify all required tools are installed."""
         print("⚙️  Checking build environment...")
@@ -87,13 +388,6 @@ class BuildSystem:
             "mock": "mock",
         }
 
-        missing = []
-        for tool, package in required.items():
-            if package is None:
-                continue
-            if not shutil.which(tool):
-                missing.append(f"{tool} (dnf install {package})")
-
         # Optional but recommended
         optional = {
             "xorriso": "xorriso",
@@ -102,10 +396,18 @@ class BuildSystem:
             "mksquashfs": "squashfs-tools",
         }
 
-        optional_missing = []
-        for tool, package in optional.items():
-            if not shutil.which(tool):
-                optional_missing.append(f"{tool} (dnf install {package})")
+        found = {tool for tool in (*required, *optional) if which(tool)}
+
+        missing = [
+            f"{tool} (dnf install {package})"
+            for tool, package in required.items()
+            if package is not None and tool not in found
+        ]
+        optional_missing = [
+            f"{tool} (dnf install {package})"
+            for tool, package in optional.items()
+            if tool not in found
+        ]
 
         if missing:
             print("  ❌ Missing required tools:")
@@ -134,6 +436,7 @@ class BuildSystem:
         if not self.check_environment():
             raise RuntimeError("Missing required build tools. Install them and retry.")
 
+        succeeded = False
         try:
             # Step 1: Set up repository configuration
             self._setup_repos()
@@ -155,9 +458,10 @@ class BuildSystem:
                 final_name = f"{self.name}-{self.version}-{self.arch}.iso"
                 final_path = self.output_dir / final_name
                 self.output_dir.mkdir(parents=True, exist_ok=True)
-                shutil.move(str(output_iso), str(final_path))
+                self._move_iso(output_iso, final_path)
                 self._generate_checksums(final_path)
                 print(f"\n✅ Done! → {final_path}")
+                succeeded = True
                 return final_path
             else:
                 raise RuntimeError("No ISO found in compose output")
@@ -166,7 +470,13 @@ class BuildSystem:
             print(f"\n❌ Build failed: {e}")
             raise
         finally:
-            print(f"\n  Work dir preserved: {self.work_dir}")
+            # Failed builds, local mirrors and `preserve_work_dir: true`
+            # keep the work dir; otherwise it's deleted in the background
+            if succeeded and not self.mirror_locally and not self.manifest.get("preserve_work_dir"):
+                discard_tree(self.work_dir, self.work_dir.parent)
+            else:
+                print(f"\n  Work dir preserved: {self.work_dir}")
+                print(f"    (delete manually when done: rm -rf {self.work_dir})")
 
     def _setup_repos(self):
         """Set up repository configs for the build."""
@@ -175,22 +485,25 @@ class BuildSystem:
         self.repo_dir.mkdir(parents=True, exist_ok=True)
 
         # Get upstream repo URLs
-        upstream_repos = self.UPSTREAM_REPOS.get(self.upstream)
+        upstream_repos = self._resolved_repos(self.upstream, self.arch)
         if not upstream_repos:
             # Allow custom upstream definition
-            upstream_repos = self.manifest.get("build_system", {}).get("upstream_repos", {})
-            if not upstream_repos:
+            custom = self.manifest.get("build_system", {}).get("upstream_repos", {})
+            if not custom:
                 raise ValueError(
                     f"Unknown upstream: {self.upstream}. "
                     f"Supported: {', '.join(self.UPSTREAM_REPOS.keys())} "
                     f"or define 'upstream_repos' in build_system config."
                 )
+            upstream_repos = [
+                (repo_id, url.replace("$arch", self.arch)) for repo_id, url in custom.items()
+            ]
 
-        # Write repo files
+        # Collect repo files; they're written below while the repos are probed
         all_repos = []
+        repo_files = []
 
-        for repo_id, baseurl in upstream_repos.items():
-            url = baseurl.replace("$arch", self.arch)
+        for repo_id, url in upstream_repos:
             repo_content = (
                 f"[{repo_id}]\n"
                 f"name={self.upstream} - {repo_id}\n"
@@ -199,7 +512,7 @@ class BuildSystem:
                 f"gpgcheck=0\n"
             )
             repo_file = self.repo_dir / f"{repo_id}.repo"
-            repo_file.write_text(repo_content)
+            repo_files.append((repo_file, repo_content))
             all_repos.append({"id": repo_id, "url": url, "file": repo_file})
             print(f"  → {repo_id}: {url}")
 
@@ -215,13 +528,40 @@ class BuildSystem:
             if repo.get("gpgkey"):
                 repo_content += f"gpgkey={repo['gpgkey']}\n"
             repo_file = self.repo_dir / f"{repo['name']}.repo"
-            repo_file.write_text(repo_content)
+            repo_files.append((repo_file, repo_content))
             all_repos.append({"id": repo["name"], "url": repo["baseurl"], "file": repo_file})
             print(f"  → {repo['name']}: {repo['baseurl']}")
 
         self._all_repos = all_repos
+        with ThreadPoolExecutor(max_workers=min(8, len(repo_files) or 1)) as pool:
+            writes = [pool.submit(path.write_text, content) for path, content in repo_files]
+            self._check_repos(all_repos)
+            for write in writes:
+                write.result()
         print(f"  ✅ {len(all_repos)} repos configured")
 
+    def _check_repos(self, repos):
+        """
+        Probe every repo concurrently so a dead mirror fails the build now,
+        not hours into the compose. Skip with build_system.skip_repo_check.
+        """
+        if self.manifest.get("build_system", {}).get("skip_repo_check"):
+            return
+
+        # URLs with dnf variables ($releasever etc.) can't be probed as-is
+        urls = [r["url"] for r in repos if "$" not in r["url"]]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            errors = [err for err in pool.map(_probe_repo, urls) if err]
+
+        if errors:
+            print("  ❌ Unreachable repos:")
+            for err in errors:
+                print(f"    - {err}")
+            raise RuntimeError(
+                "Some repos are unreachable. Fix the URLs (or set "
+                "build_system.skip_repo_check) and retry."
+            )
+
     def _run_lorax_compose(self):
         """
         Use lorax to compose a bootable install ISO.
@@ -230,37 +570,32 @@ class BuildSystem:
         print("⚙️  Running lorax compose...")
 
         self.compose_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
 
         # Generate lorax kickstart
         ks_path = self._generate_lorax_kickstart()
 
-        # Build repo args
-        repo_args = []
-        for repo in self._all_repos:
-            repo_args += ["--repo", repo["url"]]
-
         # Build lorax command
         cmd = [
             "lorax",
             f"--product={self.name}",
             f"--version={self.version}",
             f"--release={self.release}",
-            f"--source={self._all_repos[0]['url']}",  # Primary source
             f"--resultdir={self.compose_dir}",
             f"--variant=BaseOS",
             f"--buildarch={self.arch}",
+            f"--cachedir={self.cache_dir}",
             "--isfinal",
         ]
 
-        # Add all repos as sources
+        # Add all repos as sources, each URL once (the first is primary)
+        seen = set()
         for repo in self._all_repos:
-            cmd += [f"--source={repo['url']}"]
+            if repo["url"] not in seen:
+                seen.add(repo["url"])
+                cmd.append(f"--source={repo['url']}")
 
-        # Volume ID
-        vol_id = f"{self.name}-{self.version}-{self.arch}"
-        if len(vol_id) > 32:
-            vol_id = vol_id[:32]
-        cmd += [f"--volid={vol_id}"]
+        cmd += [f"--volid={self._ctx.vol_id}"]
 
         print(f"  → Running: lorax (this takes a while...)")
         self._run_cmd(cmd, timeout=3600)
@@ -296,26 +631,14 @@ class BuildSystem:
         self.ks_dir.mkdir(parents=True, exist_ok=True)
         ks_path = self.ks_dir / "lorax.ks"
 
-        gui = self.manifest.get("gui", {})
-        packages = self.manifest.get("packages", {})
+        ctx = self._ctx
 
         # Package list
         pkg_lines = ["@core"]
-        if gui.get("enabled"):
-            desktop = gui.get("desktop", "GNOME").lower()
-            desktop_map = {
-                "gnome": "@gnome-desktop",
-                "kde": "@kde-desktop-environment",
-                "xfce": "@xfce-desktop",
-                "mate": "@mate-desktop",
-                "cinnamon": "@cinnamon-desktop",
-            }
-            pkg_lines.append(desktop_map.get(desktop, "@gnome-desktop"))
-
-        for pkg in packages.get("install", []):
-            pkg_lines.append(pkg)
-        for pkg in packages.get("remove", []):
-            pkg_lines.append(f"-{pkg}")
+        if ctx.desktop_group:
+            pkg_lines.append(ctx.desktop_group)
+        pkg_lines += ctx.install_pkgs
+        pkg_lines += [f"-{pkg}" for pkg in ctx.remove_pkgs]
 
         # Repo lines
         repo_lines = []
@@ -331,81 +654,26 @@ class BuildSystem:
         """Generate a pungi configuration file."""
         conf_path = self.work_dir / "pungi.conf"
 
-        gui = self.manifest.get("gui", {})
-        packages = self.manifest.get("packages", {})
-
-        # Collect packages
-        all_packages = ["@core"] + packages.get("install", [])
-        if gui.get("enabled"):
-            desktop = gui.get("desktop", "GNOME").lower()
-            desktop_map = {
-                "gnome": "@gnome-desktop",
-                "kde": "@kde-desktop-environment",
-                "xfce": "@xfce-desktop",
-                "mate": "@mate-desktop",
-                "cinnamon": "@cinnamon-desktop",
-            }
-            all_packages.append(desktop_map.get(desktop, "@gnome-desktop"))
-
         # Build repo list for pungi
         repo_entries = {}
         for repo in self._all_repos:
             repo_entries[repo["id"]] = repo["url"]
 
-        # Volume ID
-        vol_id = f"{self.name}-{self.version}"
-        if len(vol_id) > 32:
-            vol_id = vol_id[:32]
-
-        config = f"""# Pungi config for {self.name} {self.version}
-# Generated by Distro Forge on {datetime.now().strftime('%Y-%m-%d %H:%M')}
-
-release_name = "{self.name}"
-release_short = "{self.os_id}"
-release_version = "{self.version}"
-release_is_layered = False
-
-bootable = True
-comps_file = "{self._generate_comps()}"
-
-arch = ["{self.arch}"]
-
-# ── Variants ──
-variants_file = "{self._generate_variants()}"
-
-# ── Signing ──
-sigkeys = [""]
-
-# ── Repos ──
-pkgset_source = "repos"
-pkgset_repos = {{
-"""
-        for repo_id, url in repo_entries.items():
-            config += f'    "{repo_id}": "{url}",\n'
-
-        config += f"""}}
-
-# ── Gather ──
-gather_method = "deps"
-gather_backend = "dnf"
-check_deps = False
-greedy_method = "build"
-
-# ── Create ISO ──
-createiso_skip = []
-create_optional_isos = False
-
-# ── Build install images ──
-buildinstall_method = "lorax"
-buildinstall_treeinfo_name = "{self.name}"
+        repo_lines = "".join(
+            f'    "{repo_id}": "{url}",\n' for repo_id, url in repo_entries.items()
+        )
 
-# ── ISO naming ──
-image_name_format = "{self.name}-{self.version}-%(variant)s-%(arch)s-%(disc_type)s%(disc_num)s.iso"
-image_volid_formats = {{
-    "boot": "{vol_id}-%(variant)s-%(arch)s-boot",
-    "dvd": "{vol_id}-%(variant)s-%(arch)s-dvd",
-}}
-"""
+        config = _PUNGI_TEMPLATE.substitute(
+            name=self.name,
+            version=self.version,
+            os_id=self.os_id,
+            arch=self.arch,
+            generated=datetime.now().strftime('%Y-%m-%d %H:%M'),
+            comps_file=self._generate_comps(),
+            variants_file=self._generate_variants(),
+            repo_lines=repo_lines,
+            vol_id=self._ctx.pungi_vol_id,
+        )
         conf_path.write_text(config)
         print(f"  → Pungi config: {conf_path}")
         return str(conf_path)
@@ -414,101 +682,39 @@ image_volid_formats = {{
         """Generate a minimal comps.xml for package groups."""
         comps_path = self.work_dir / "comps.xml"
 
-        gui = self.manifest.get("gui", {})
-        packages = self.manifest.get("packages", {})
+        desktop = self._ctx.desktop
 
-        groups_xml = ""
+        # Built as an element tree so package / group names are escaped
+        comps = ET.Element("comps")
 
         # Core group (always present)
-        core_packages = "\n".join(
-            f'      <packagereq type="mandatory">{pkg}</packagereq>'
-            for pkg in packages.get("install", [])
+        _comps_group(
+            comps, "core", "Core", "Minimal install",
+            CORE_PACKAGES + self._ctx.install_pkgs,
         )
 
-        groups_xml += f"""
-  <group>
-    <id>core</id>
-    <name>Core</name>
-    <description>Minimal install</description>
-    <default>true</default>
-    <uservisible>true</uservisible>
-    <packagelist>
-      <packagereq type="mandatory">basesystem</packagereq>
-      <packagereq type="mandatory">bash</packagereq>
-      <packagereq type="mandatory">coreutils</packagereq>
-      <packagereq type="mandatory">filesystem</packagereq>
-      <packagereq type="mandatory">glibc</packagereq>
-      <packagereq type="mandatory">NetworkManager</packagereq>
-      <packagereq type="mandatory">rpm</packagereq>
-      <packagereq type="mandatory">dnf</packagereq>
-      <packagereq type="mandatory">systemd</packagereq>
-{core_packages}
-    </packagelist>
-  </group>
-"""
-
         # Desktop group if GUI enabled
-        if gui.get("enabled"):
-            desktop = gui.get("desktop", "GNOME").lower()
-            desktop_pkgs = {
-                "gnome": ["gnome-shell", "gnome-terminal", "nautilus", "gdm", "gnome-tweaks"],
-                "kde": ["plasma-desktop", "konsole", "dolphin", "sddm"],
-                "xfce": ["xfce4-panel", "xfce4-terminal", "thunar", "lightdm"],
-                "mate": ["mate-panel", "mate-terminal", "caja", "lightdm"],
-                "cinnamon": ["cinnamon", "nemo", "gnome-terminal", "lightdm"],
-            }
-            pkgs = desktop_pkgs.get(desktop, desktop_pkgs["gnome"])
-            pkg_xml = "\n".join(
-                f'      <packagereq type="mandatory">{p}</packagereq>'
-                for p in pkgs
+        if desktop:
+            _comps_group(
+                comps, f"{desktop}-desktop", f"{desktop.upper()} Desktop",
+                f"{desktop.upper()} Desktop Environment",
+                self._ctx.desktop_packages,
             )
-            groups_xml += f"""
-  <group>
-    <id>{desktop}-desktop</id>
-    <name>{desktop.upper()} Desktop</name>
-    <description>{desktop.upper()} Desktop Environment</description>
-    <default>true</default>
-    <uservisible>true</uservisible>
-    <packagelist>
-{pkg_xml}
-    </packagelist>
-  </group>
-"""
 
-        comps_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<!DOCTYPE comps PUBLIC "-//Red Hat, Inc.//DTD Comps info//EN" "comps.dtd">
-<comps>
-{groups_xml}
-
-  <environment>
-    <id>minimal-environment</id>
-    <name>Minimal Install</name>
-    <description>Basic functionality.</description>
-    <display_order>5</display_order>
-    <grouplist>
-      <groupid>core</groupid>
-    </grouplist>
-  </environment>
-"""
-
-        if gui.get("enabled"):
-            desktop = gui.get("desktop", "GNOME").lower()
-            comps_xml += f"""
-  <environment>
-    <id>desktop-environment</id>
-    <name>{desktop.upper()} Desktop</name>
-    <description>Desktop with {desktop.upper()}.</description>
-    <display_order>1</display_order>
-    <grouplist>
-      <groupid>core</groupid>
-      <groupid>{desktop}-desktop</groupid>
-    </grouplist>
-  </environment>
-"""
-
-        comps_xml += "\n</comps>\n"
+        _comps_environment(
+            comps, "minimal-environment", "Minimal Install",
+            "Basic functionality.", 5, ["core"],
+        )
+        if desktop:
+            _comps_environment(
+                comps, "desktop-environment", f"{desktop.upper()} Desktop",
+                f"Desktop with {desktop.upper()}.", 1, ["core", f"{desktop}-desktop"],
+            )
 
-        comps_path.write_text(comps_xml)
+        comps_path.write_text(_xml_document(
+            comps,
+            '<!DOCTYPE comps PUBLIC "-//Red Hat, Inc.//DTD Comps info//EN" "comps.dtd">\n',
+        ))
         print(f"  → Comps XML: {comps_path}")
         return str(comps_path)
 
@@ -516,57 +722,30 @@ image_volid_formats = {{
         """Generate a variants XML file for pungi."""
         variants_path = self.work_dir / "variants.xml"
 
-        gui = self.manifest.get("gui", {})
-
-        env_id = "minimal-environment"
-        if gui.get("enabled"):
-            env_id = "desktop-environment"
-
-        variants_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<variants>
-  <variant id="BaseOS" name="BaseOS" type="variant">
-    <arches>
-      <arch>{self.arch}</arch>
-    </arches>
-    <groups>
-      <group>core</group>
-    </groups>
-    <environments>
-      <environment>{env_id}</environment>
-    </environments>
-  </variant>
-"""
+        desktop = self._ctx.desktop
+        env_id = "desktop-environment" if desktop else "minimal-environment"
 
-        if gui.get("enabled"):
-            desktop = gui.get("desktop", "GNOME").lower()
-            variants_xml += f"""
-  <variant id="AppStream" name="AppStream" type="variant">
-    <arches>
-      <arch>{self.arch}</arch>
-    </arches>
-    <groups>
-      <group>{desktop}-desktop</group>
-    </groups>
-  </variant>
-"""
+        variants = ET.Element("variants")
+        base = _variant(variants, "BaseOS", self.arch, ["core"])
+        ET.SubElement(ET.SubElement(base, "environments"), "environment").text = env_id
 
-        variants_xml += "</variants>\n"
+        if desktop:
+            _variant(variants, "AppStream", self.arch, [f"{desktop}-desktop"])
 
-        variants_path.write_text(variants_xml)
+        variants_path.write_text(_xml_document(variants))
         print(f"  → Variants XML: {variants_path}")
         return str(variants_path)
 
     def _render_kickstart(self, repo_lines, pkg_lines):
         """Render a kickstart file from parts."""
         ks_config = self.manifest.get("kickstart", {})
-        gui = self.manifest.get("gui", {})
 
         tz = ks_config.get("timezone", "UTC")
         lang = ks_config.get("lang", "en_US.UTF-8")
         keyboard = ks_config.get("keyboard", "us")
         selinux = self.manifest.get("selinux", "enforcing")
 
-        display = "graphical" if gui.get("enabled") else "text"
+        display = "graphical" if self._ctx.desktop else "text"
 
         firewall_line = "firewall --enabled --service=ssh"
         if self.manifest.get("firewall") is False:
@@ -579,64 +758,20 @@ image_volid_formats = {{
         if ks_config.get("root_password_value"):
             root_pw = f"rootpw --plaintext {ks_config['root_password_value']}"
 
-        repo_section = "\n".join(repo_lines)
-        pkg_section = "\n".join(pkg_lines)
-
-        return f"""# {self.name} {self.version} — Build System Kickstart
-# Generated by Distro Forge
-
-{display}
-
-lang {lang}
-keyboard --vckeymap={keyboard} --xlayouts='{keyboard}'
-timezone {tz} --utc
-network --bootproto=dhcp --activate
-network --hostname={self.os_id}
-
-{root_pw}
-
-selinux --{selinux}
-{firewall_line}
-
-ignoredisk --only-use=sda
-autopart --type=lvm
-clearpart --all --initlabel
-bootloader --append="crashkernel=auto" --location=mbr
-
-{repo_section}
-
-reboot --eject
-
-%packages
-{pkg_section}
-%end
-
-%post --log=/root/distro-forge-post.log
-echo '=== {self.name} post-install ==='
-
-cat > /etc/os-release << 'EOF'
-NAME="{self.name}"
-VERSION="{self.version}"
-ID="{self.os_id}"
-ID_LIKE="rhel centos fedora"
-VERSION_ID="{self.version}"
-PRETTY_NAME="{self.name} {self.version}"
-ANSI_COLOR="0;31"
-CPE_NAME="cpe:/o:{self.os_id}:{self.os_id}:{self.version}"
-EOF
-
-echo "{self.name} release {self.version}" > /etc/system-release
-echo "{self.name} release {self.version}" > /etc/redhat-release
-
-cat > /etc/motd << 'EOF'
-
-  Welcome to {self.name} {self.version}
-
-EOF
-
-echo '{self.name} installation complete.'
-%end
-"""
+        return _KICKSTART_TEMPLATE.substitute(
+            name=self.name,
+            version=self.version,
+            os_id=self.os_id,
+            display=display,
+            lang=lang,
+            keyboard=keyboard,
+            tz=tz,
+            root_pw=root_pw,
+            selinux=selinux,
+            firewall_line=firewall_line,
+            repo_section="\n".join(repo_lines),
+            pkg_section="\n".join(pkg_lines),
+        )
 
     def _apply_branding(self):
         """Apply branding to the composed output."""
@@ -662,19 +797,21 @@ echo '{self.name} installation complete.'
             return self.compose_dir
 
         # Pungi — look for the compose tree
-        for dirpath, dirnames, filenames in os.walk(self.compose_dir):
-            if "images" in dirnames or ".treeinfo" in filenames:
-                return Path(dirpath)
+        for dirpath, entries in _scan_tree(self.compose_dir):
+            for e in entries:
+                if ((e.name == "images" and e.is_dir())
+                        or (e.name == ".treeinfo" and e.is_file())):
+                    return Path(dirpath)
 
         return self.compose_dir
 
     def _find_output_iso(self):
         """Find the built ISO in the compose output."""
         # Search for .iso files
-        for dirpath, _, filenames in os.walk(self.compose_dir):
-            for f in filenames:
-                if f.endswith(".iso"):
-                    return Path(dirpath) / f
+        for _, entries in _scan_tree(self.compose_dir):
+            for e in entries:
+                if e.name.endswith(".iso") and e.is_file():
+                    return Path(e.path)
 
         # Lorax may not produce an ISO directly — we need to create one
         if (self.compose_dir / "images" / "boot.iso").exists():
@@ -687,40 +824,20 @@ echo '{self.name} installation complete.'
         """Create an ISO from the compose tree if lorax didn't make one."""
         print("⚙️  Creating ISO from compose tree...")
 
-        if not shutil.which("xorriso"):
+        if not which("xorriso"):
             print("  ❌ xorriso required to create ISO")
             return None
 
         output_iso = self.compose_dir / f"{self.name}-{self.version}-{self.arch}.iso"
-        vol_id = f"{self.name}-{self.version}-{self.arch}"[:32]
+        cmd = [*self._XORRISO_PREFIX, "-V", self._ctx.vol_id, "-o", str(output_iso)]
 
-        cmd = [
-            "xorriso", "-as", "mkisofs",
-            "-V", vol_id,
-            "-R", "-J",
-            "-o", str(output_iso),
-            str(self.compose_dir),
-        ]
+        # Boot images, if the compose produced them
+        if (self.compose_dir / "isolinux" / "isolinux.bin").exists():
+            cmd += self._ISOLINUX_ARGS
+        if (self.compose_dir / "images" / "efiboot.img").exists():
+            cmd += self._EFI_ARGS
 
-        # Check for boot images
-        efi_boot = self.compose_dir / "images" / "efiboot.img"
-        isolinux_bin = self.compose_dir / "isolinux" / "isolinux.bin"
-
-        if isolinux_bin.exists():
-            cmd = cmd[:-1] + [
-                "-b", "isolinux/isolinux.bin",
-                "-c", "isolinux/boot.cat",
-                "-no-emul-boot",
-                "-boot-load-size", "4",
-                "-boot-info-table",
-            ] + cmd[-1:]
-
-        if efi_boot.exists():
-            cmd = cmd[:-1] + [
-                "-eltorito-alt-boot",
-                "-e", "images/efiboot.img",
-                "-no-emul-boot",
-            ] + cmd[-1:]
+        cmd.append(str(self.compose_dir))
 
         try:
             self._run_cmd(cmd)
@@ -729,37 +846,83 @@ echo '{self.name} installation complete.'
             print(f"  ❌ ISO creation failed: {e}")
             return None
 
+    def _move_iso(self, src: Path, dst: Path):
+        """
+        Move the composed ISO to the output dir. A rename when both are on
+        one filesystem; otherwise fast_copy (reflink, then in-kernel copy).
+        """
+        try:
+            os.rename(src, dst)
+            print(f"  → Moved ISO to {dst}")
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        fast_copy(src, dst)
+        os.unlink(src)
+        print(f"  → Copied ISO across filesystems to {dst}")
+
     def _generate_checksums(self, iso_path: Path):
-        """Generate SHA256 checksum."""
+        """
+        Generate checksum files (SHA256 by default; more via the manifest's
+        `checksums` list, e.g. [sha256, sha1]), all from one streamed read.
+        Shares the remaster builder's reader, which overlaps reads with hashing.
+        """
         print("⚙️  Generating checksums...")
-        checksum_file = iso_path.with_suffix(".iso.sha256")
+        algos = self.manifest.get("checksums") or ["sha256"]
         try:
-            if shutil.which("sha256sum"):
-                cmd = f"sha256sum {iso_path}"
-            elif shutil.which("shasum"):
-                cmd = f"shasum -a 256 {iso_path}"
-            else:
-                return
-
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            if result.returncode == 0:
-                checksum_file.write_text(result.stdout)
+            digests = stream_digests(iso_path, algos)
+            for algo in algos:
+                checksum_file = iso_path.with_suffix(f".iso.{algo}")
+                # <algo>sum layout, so `sha256sum -c` & co. work next to the ISO
+                checksum_file.write_text(f"{digests[algo]}  {iso_path.name}\n")
                 print(f"  → Checksum: {checksum_file}")
-        except Exception:
-            pass
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️  Checksum generation failed: {e}")
 
-    @staticmethod
-    def _run_cmd(cmd, timeout=600):
-        """Run a command with output streaming."""
+    def _run_cmd(self, cmd, timeout=600):
+        """
+        Run a command with output streaming.
+        Output is echoed live and teed to work_dir/logs/<tool>.log; only
+        the last 500 lines are kept in memory for the error report.
+        """
         print(f"  → {' '.join(str(c) for c in cmd[:5])}...")
-        result = subprocess.run(
-            cmd, capture_output=True, text=True, timeout=timeout
-        )
-        if result.returncode != 0:
-            stderr_snippet = result.stderr[:500] if result.stderr else "no stderr"
+
+        log_dir = self.work_dir / "logs"
+        log_dir.mkdir(parents=True, exist_ok=True)
+        log_path = log_dir / f"{Path(cmd[0]).name}.log"
+        tail = deque(maxlen=500)
+
+        with open(log_path, "a") as log, subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, bufsize=1, start_new_session=True
+        ) as proc:
+            # Reading stdout blocks, so enforce the timeout from a timer;
+            # kill the whole group so no child keeps the pipe open
+            timer = threading.Timer(timeout, _killpg, (proc.pid, signal.SIGKILL))
+            timer.start()
+            try:
+                for line in proc.stdout:
+                    sys.stdout.write(line)
+                    log.write(line)
+                    tail.append(line)
+                returncode = proc.wait()
+            except BaseException:
+                # The tool runs in its own session, so Ctrl-C doesn't reach
+                # it; take the group down rather than orphan lorax/pungi
+                _killpg(proc.pid, signal.SIGTERM)
+                proc.wait()
+                raise
+            finally:
+                timed_out = not timer.is_alive()
+                timer.cancel()
+
+        output = "".join(tail)
+        if timed_out:
+            raise subprocess.TimeoutExpired(cmd, timeout, output=output)
+        if returncode != 0:
+            print(f"  → Full log: {log_path}")
             raise subprocess.CalledProcessError(
-                result.returncode, cmd,
-                output=result.stdout,
-                stderr=result.stderr
+                returncode, cmd, output=output, stderr=output
             )
-        return result
+        return subprocess.CompletedProcess(cmd, returncode, stdout=output)
@@ -0,0 +1,219 @@
+"""
+Filesystem helpers shared by the engines — file copies (reflink first,
+then in-kernel), hardlink-or-copy, streaming checksums, background
+tree deletion and a cached $PATH lookup. Standard library only, so any engine can import it
+without pulling in the others.
+"""
+
+import os
+import errno
+import fcntl
+import atexit
+import shutil
+import hashlib
+from uuid import uuid4
+from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+
+# ioctl(2) request: share src's extents with dst (btrfs/XFS reflink)
+_FICLONE = 0x40049409
+
+# Buffer for the user-space copy fallback
+_COPY_BUFSIZE = 256 * 1024
+
+# Read size for streaming checksums
+_HASH_CHUNK = 1024 * 1024
+
+# Deletes discarded trees off the critical path; drained at exit
+_GC_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="df-gc")
+atexit.register(_GC_EXECUTOR.shutdown, wait=True)
+
+
+@lru_cache(maxsize=None)
+def _path_index():
+    """
+    One pass over $PATH: {command name: first directory listing it}.
+    Names only (no stat per entry); which() checks the exec bit on hits.
+    """
+    index = {}
+    for directory in os.get_exec_path():
+        try:
+            with os.scandir(directory or os.curdir) as it:
+                for entry in it:
+                    index.setdefault(entry.name, directory)
+        except OSError:
+            continue
+    return index
+
+
+@lru_cache(maxsize=None)
+def which(tool):
+    """
+    shutil.which, memoized and answered from a single scan of $PATH
+    (which doesn't change under us). Returns the tool's path or None.
+    """
+    if os.sep in tool:
+        return shutil.which(tool)
+    directory = _path_index().get(tool)
+    if directory is None:
+        return None
+    path = os.path.join(directory or os.curdir, tool)
+    if os.path.isfile(path) and os.access(path, os.X_OK):
+        return path
+    return shutil.which(tool)  # shadowed by a non-executable
+
+
+def _copy_fd(src_fd, dst_fd, size):
+    """
+    Move size bytes between fds: a FICLONE reflink where the filesystem
+    allows it, else in-kernel (copy_file_range, then sendfile), else a
+    read/write loop. The in-kernel paths work off the current file offsets,
+    so a fallback picks up where the previous one stopped. An in-kernel
+    call that returns 0 early (some filesystem/kernel pairs do that instead
+    of failing) counts as unsupported. Raises OSError if fewer than size
+    bytes could be copied.
+    """
+    try:
+        fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+        return
+    except OSError:
+        pass  # no reflink support, or src and dst on different filesystems
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(src_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    remaining = size
+    for splice in (getattr(os, "copy_file_range", None), os.sendfile):
+        if splice is None:
+            continue
+        try:
+            while remaining > 0:
+                if splice is os.sendfile:
+                    n = os.sendfile(dst_fd, src_fd, None, remaining)
+                else:
+                    n = splice(src_fd, dst_fd, remaining)
+                if not n:
+                    break  # no progress; try the next method
+                remaining -= n
+        except OSError:
+            continue  # not supported for this fd pair; try the next one
+        if remaining <= 0:
+            return
+    while remaining > 0:
+        buf = os.read(src_fd, min(_COPY_BUFSIZE, remaining))
+        if not buf:
+            break
+        view = memoryview(buf)
+        while view:
+            view = view[os.write(dst_fd, view):]
+        remaining -= len(buf)
+    if remaining > 0:
+        raise OSError(errno.EIO, f"Short copy: {remaining} of {size} bytes not copied")
+
+
+def _copy_data(src, dst, mode=0o644):
+    """Copy src's bytes to dst (created or truncated); returns src's stat."""
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        st = os.fstat(src_fd)
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        try:
+            _copy_fd(src_fd, dst_fd, st.st_size)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    return st
+
+
+def fast_copy(src, dst):
+    """
+    shutil.copy2 replacement (also a copytree copy_function): reflink,
+    then in-kernel copy, then a buffered copy; metadata via copystat.
+    """
+    _copy_data(src, dst)
+    shutil.copystat(src, dst)
+    return dst
+
+
+def copy_file(src, dst) -> int:
+    """
+    Copy one file like fast_copy, but carry over only the mtime (what
+    createrepo's --update keys on), skipping copystat's extra syscalls.
+    Returns the size copied.
+    """
+    st = _copy_data(src, dst)
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+    return st.st_size
+
+
+def link_or_copy(src, dst):
+    """
+    Hardlink src at dst, replacing dst; copies instead where a link isn't
+    possible (another filesystem, protected_hardlinks). Only for files
+    that are read, never modified, afterwards.
+    """
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dst)
+    except OSError:
+        fast_copy(src, dst)
+
+
+def stream_digests(path: Path, algos=("sha256",)) -> dict:
+    """
+    Hash a file with every algorithm in algos in a single read pass,
+    streaming fixed chunks (no whole-file reads). Two buffers alternate
+    so the next read overlaps hashing of the previous chunk (hashlib
+    releases the GIL on large updates).
+    Returns {algo: hexdigest, ..., "size": bytes read}.
+    """
+    hashers = {algo: hashlib.new(algo) for algo in algos}
+
+    def update(chunk):
+        for h in hashers.values():
+            h.update(chunk)
+
+    size = 0
+    bufs = [memoryview(bytearray(_HASH_CHUNK)) for _ in range(2)]
+    with open(path, "rb") as f, ThreadPoolExecutor(max_workers=1) as pool:
+        # Ask for aggressive readahead (Linux; no-op elsewhere)
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        pending = None
+        i = 0
+        while n := f.readinto(bufs[i]):
+            if pending:
+                pending.result()
+            # Full chunks hash the buffer view itself; only the short
+            # tail needs a (zero-copy) slice
+            chunk = bufs[i] if n == _HASH_CHUNK else bufs[i][:n]
+            pending = pool.submit(update, chunk)
+            size += n
+            i ^= 1
+        if pending:
+            pending.result()
+        # The ISO is the final artifact; don't keep it in page cache
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    digests = {algo: h.hexdigest() for algo, h in hashers.items()}
+    digests["size"] = size
+    return digests
+
+
+def discard_tree(path: Path, gc_dir: Path):
+    """
+    Move a tree out of the way (one rename) and delete it in the
+    background. gc_dir must be on the same filesystem as path.
+    """
+    tmp = gc_dir / f".gc-{uuid4().hex}"
+    try:
+        os.rename(path, tmp)
+    except OSError:
+        shutil.rmtree(path, ignore_errors=True)
+        return
+    _GC_EXECUTOR.submit(shutil.rmtree, tmp, ignore_errors=True)
@@ -4,11 +4,20 @@ Handles the low-level ISO manipulation.
 """
 
 import os
+import re
 import shutil
 import subprocess
 import tempfile
 from pathlib import Path
 
+from engine.fsutil import which
+
+
+# Volume ID in `isoinfo -d` output ("Volume id: CentOS-Stream-9-...")
+_ISOINFO_VOLID_RE = re.compile(r"^Volume id:\s*(.*?)\s*$", re.MULTILINE)
+# ... and in `xorriso -report_el_torito as_mkisofs` output (-V 'CentOS-...')
+_XORRISO_VOLID_RE = re.compile(r"-V\s+(['\"]?)(.*?)\1\s*$", re.MULTILINE)
+
 
 class ISOEngine:
     """Handles ISO extraction and repacking."""
@@ -35,7 +44,7 @@ class ISOEngine:
         extracted = False
         errors = []
 
-        if shutil.which("xorriso"):
+        if which("xorriso"):
             try:
                 self._extract_with_xorriso()
                 extracted = True
@@ -49,7 +58,7 @@ class ISOEngine:
             except (PermissionError, OSError, subprocess.CalledProcessError, FileNotFoundError) as e:
                 errors.append(f"mount: {e}")
 
-        if not extracted and shutil.which("7z"):
+        if not extracted and which("7z"):
             try:
                 self._extract_with_7z()
                 extracted = True
@@ -112,7 +121,7 @@ class ISOEngine:
         self._run(cmd)
 
         # Make ISO hybrid bootable (for USB)
-        if shutil.which("isohybrid"):
+        if which("isohybrid"):
             try:
                 self._run(["isohybrid", "--uefi", str(output_path)])
             except subprocess.CalledProcessError:
@@ -123,7 +132,7 @@ class ISOEngine:
                     print("  ⚠️  isohybrid failed, ISO may not be USB-bootable")
 
         # Implant MD5 checksum
-        if shutil.which("implantisomd5"):
+        if which("implantisomd5"):
             try:
                 self._run(["implantisomd5", str(output_path)])
             except subprocess.CalledProcessError:
@@ -144,30 +153,28 @@ class ISOEngine:
 
     def _get_volume_id(self):
         """Get the volume ID from the ISO."""
-        if shutil.which("isoinfo"):
+        if which("isoinfo"):
             try:
                 result = subprocess.run(
                     ["isoinfo", "-d", "-i", str(self.base_iso)],
                     capture_output=True, text=True
                 )
-                for line in result.stdout.splitlines():
-                    if line.startswith("Volume id:"):
-                        return line.split(":", 1)[1].strip()
+                match = _ISOINFO_VOLID_RE.search(result.stdout)
+                if match:
+                    return match.group(1)
             except Exception:
                 pass
 
-        if shutil.which("xorriso"):
+        if which("xorriso"):
             try:
                 result = subprocess.run(
                     ["xorriso", "-indev", str(self.base_iso),
                      "-report_el_torito", "as_mkisofs"],
                     capture_output=True, text=True
                 )
-                for line in result.stdout.splitlines():
-                    if "-V " in line or "-volid" in line:
-                        parts = line.split("-V", 1)
-                        if len(parts) > 1:
-                            return parts[1].strip().strip("'\"")
+                match = _XORRISO_VOLID_RE.search(result.stdout)
+                if match:
+                    return match.group(2)
             except Exception:
                 pass
 
@@ -177,9 +184,11 @@ class ISOEngine:
         """Extract ISO by mounting it (needs root)."""
         self._run(["mount", "-o", "loop,ro", str(self.base_iso), str(self.mount_point)])
         try:
+            # One-shot copy, nothing to delta against: cp skips rsync's
+            # per-file checksum bookkeeping (and reflinks where it can)
             self._run([
-                "rsync", "-a", "--progress",
-                f"{self.mount_point}/", f"{self.extract_dir}/"
+                "cp", "-a", "--reflink=auto",
+                f"{self.mount_point}/.", f"{self.extract_dir}/"
             ])
         finally:
             subprocess.run(["umount", str(self.mount_point)], check=False)
@@ -189,23 +198,24 @@ class ISOEngine:
         # Use -abort_on NEVER to handle hybrid ISOs where some files
         # span past the ISO9660 boundary (El Torito boot partitions).
         # These files are still extracted correctly in practice.
+        # -report_about SORRY keeps xorriso from narrating every step;
+        # FAILURE lines (checked below) still come through on stderr.
         result = subprocess.run(
             [
-                "xorriso", "-abort_on", "NEVER",
-                "-osirrox", "on",
+                "xorriso", "-report_about", "SORRY",
+                "-abort_on", "NEVER",
+                "-osirrox", "on:auto_chmod_on",
                 "-indev", str(self.base_iso),
                 "-extract", "/", str(self.extract_dir)
             ],
-            capture_output=True, text=True
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
         )
         # xorriso may return non-zero even on partial success.
         # Check if we actually got files.
-        extracted_files = list(self.extract_dir.iterdir())
-        if not extracted_files:
+        if not any(self.extract_dir.iterdir()):
             raise subprocess.CalledProcessError(
                 result.returncode,
                 "xorriso",
-                output=result.stdout,
                 stderr=result.stderr
             )
         if result.stderr and "FAILURE" in result.stderr:
@@ -216,10 +226,11 @@ class ISOEngine:
             if len(failures) > 3:
                 print(f"  ⚠️  ... and {len(failures) - 3} more warnings")
 
-        # Fix permissions (xorriso extracts read-only)
+        # Fix permissions (xorriso extracts read-only; auto_chmod_on only
+        # opens directories up temporarily while it writes into them)
         subprocess.run(
             ["chmod", "-R", "u+w", str(self.extract_dir)],
-            capture_output=True
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
         )
 
     def _extract_with_7z(self):
@@ -228,18 +239,22 @@ class ISOEngine:
 
     @staticmethod
     def _run(cmd, **kwargs):
-        """Run a command, raising on failure."""
+        """
+        Run a command, raising on failure. No caller reads stdout, so it's
+        discarded rather than buffered (7z and xorriso list every file);
+        stderr is kept for the error.
+        """
         print(f"  → {' '.join(cmd[:4])}{'...' if len(cmd) > 4 else ''}")
         result = subprocess.run(
             cmd,
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
             text=True,
             **kwargs
         )
         if result.returncode != 0:
             raise subprocess.CalledProcessError(
                 result.returncode, cmd,
-                output=result.stdout,
                 stderr=result.stderr
             )
         return result
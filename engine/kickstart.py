@@ -29,10 +29,11 @@ class KickstartEngine:
             content = Path(template_path).read_text()
             print(f"  → Using template: {template_path}")
         else:
+            # repo_configs may be a generator; it's walked twice below
             content = self._generate_default(
                 packages_install or [],
                 packages_remove or [],
-                repo_configs or []
+                list(repo_configs or ())
             )
             print("  → Generated default kickstart")
 
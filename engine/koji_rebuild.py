@@ -23,11 +23,79 @@ Pipeline:
 
 import os
 import re
-import shutil
+import signal
+import threading
 import subprocess
 import tempfile
 from pathlib import Path
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from engine.fsutil import link_or_copy, which
+
+# Upstream distro names rewritten to the new name; longest first, so
+# "CentOS Stream" wins over "CentOS" in the alternation
+_UPSTREAM_NAMES = (
+    "CentOS Stream", "CentOS Linux", "CentOS",
+    "Rocky Linux", "AlmaLinux", "Red Hat Enterprise Linux",
+)
+_UPSTREAM_NAMES_RE = re.compile("|".join(map(re.escape, _UPSTREAM_NAMES)))
+
+# Everything KojiRebuilder._rebrand_spec_content edits, as one alternation
+# so the spec is rewritten in a single scan; the group name says which
+_SPEC_EDIT_RE = re.compile(
+    r"(?P<name>^Name:.*$)"
+    r"|(?P<vendor>^Vendor:\s+.*$)"
+    r"|(?P<release>^Release:.*$)"
+    r"|(?P<changelog>%changelog)"
+    rf"|(?P<brand>{_UPSTREAM_NAMES_RE.pattern})",
+    re.MULTILINE,
+)
+
+
+def _run_streaming(cmd, timeout, tail=50):
+    """
+    subprocess.run(capture_output=True) for long, chatty builds: stdout and
+    stderr are drained line by line on their own threads and only the last
+    `tail` lines of each are kept, so neither the child (full pipe) nor
+    our memory grows with the build log. Kills the process group and
+    raises TimeoutExpired after `timeout` seconds, and takes the group
+    down on any other exception too (Ctrl-C doesn't reach the new session).
+    """
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, errors="replace", start_new_session=True
+    )
+    tails = (deque(maxlen=tail), deque(maxlen=tail))
+
+    def drain(pipe, lines):
+        with pipe:
+            for line in pipe:
+                lines.append(line)
+
+    readers = [
+        threading.Thread(target=drain, args=(pipe, lines), daemon=True)
+        for pipe, lines in zip((proc.stdout, proc.stderr), tails)
+    ]
+    for reader in readers:
+        reader.start()
+    try:
+        returncode = proc.wait(timeout=timeout)
+    except BaseException:
+        # the whole group, so no grandchild (mock's chroot) keeps the pipes open
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+        raise
+    finally:
+        for reader in readers:
+            reader.join(timeout=5)
+
+    stdout, stderr = ("".join(lines) for lines in tails)
+    return subprocess.CompletedProcess(cmd, returncode, stdout=stdout, stderr=stderr)
 
 
 class KojiRebuilder:
@@ -67,6 +135,12 @@ class KojiRebuilder:
         ],
     }
 
+    # Upstream package-name prefixes swapped for os_id; longest first, so
+    # "centos-stream-release" never matches as "centos-" + "stream-release"
+    _UPSTREAM_PREFIXES = tuple(sorted(
+        {"centos-stream-", "centos-", "rocky-", "almalinux-"}, key=len, reverse=True
+    ))
+
     def __init__(self, manifest: dict, output_dir: Path):
         self.manifest = manifest
         self.output_dir = output_dir
@@ -76,6 +150,9 @@ class KojiRebuilder:
             "os_id", self.name.lower().replace(" ", "-")
         )
         self.vendor = manifest.get("vendor", self.name)
+        # Concurrent package builds; each mock build already uses every
+        # core (%_smp_mflags), so keep this small
+        self.jobs = manifest.get("jobs", 2)
 
         rebuild_config = manifest.get("rebuild", {})
         self.backend = rebuild_config.get("backend", "mock")  # mock or koji
@@ -91,8 +168,9 @@ class KojiRebuilder:
         self.specs_dir = self.work_dir / "specs"
         self.sources_dir = self.work_dir / "sources"
 
-        for d in [self.srpms_dir, self.rpms_dir, self.specs_dir, self.sources_dir]:
-            d.mkdir(parents=True, exist_ok=True)
+        # work_dir is fresh from mkdtemp: no parents to create, nothing to race
+        for d in (self.srpms_dir, self.rpms_dir, self.specs_dir, self.sources_dir):
+            d.mkdir()
 
     def check_environment(self):
         """Verify build tools are available."""
@@ -105,12 +183,14 @@ class KojiRebuilder:
             required["mock"] = "mock"
 
         required["rpm"] = "rpm"
+        required["rpm2cpio"] = "rpm"
+        required["cpio"] = "cpio"
         required["rpmbuild"] = "rpm-build"
         required["rpmdev-setuptree"] = "rpmdevtools"
 
         missing = []
         for tool, package in required.items():
-            if not shutil.which(tool):
+            if not which(tool):
                 missing.append(f"{tool} (dnf install {package})")
 
         if missing:
@@ -155,7 +235,7 @@ class KojiRebuilder:
             output_rpms_dir = self.output_dir / "rpms"
             output_rpms_dir.mkdir(parents=True, exist_ok=True)
             for rpm in built_rpms:
-                shutil.copy2(rpm, output_rpms_dir / rpm.name)
+                link_or_copy(rpm, output_rpms_dir / rpm.name)
                 print(f"  → {rpm.name}")
 
             print(f"\n✅ {len(built_rpms)} RPMs built → {output_rpms_dir}")
@@ -177,11 +257,9 @@ class KojiRebuilder:
             print("  Attempting generic centos-stream packages...")
             packages = self.BRANDING_PACKAGES["centos-stream"]
 
-        srpms = []
-        for pkg in packages:
-            srpm = self._download_srpm(pkg)
-            if srpm:
-                srpms.append(srpm)
+        # Network-bound and independent, so fetch them all at once
+        with ThreadPoolExecutor(max_workers=min(8, len(packages))) as pool:
+            srpms = [srpm for srpm in pool.map(self._download_srpm, packages) if srpm]
 
         if not srpms:
             raise RuntimeError("Could not download any source RPMs")
@@ -194,7 +272,7 @@ class KojiRebuilder:
         print(f"  → Downloading SRPM: {package_name}")
 
         # Try dnf download --source
-        if shutil.which("dnf"):
+        if which("dnf"):
             try:
                 result = subprocess.run(
                     ["dnf", "download", "--source", "--destdir",
@@ -209,7 +287,7 @@ class KojiRebuilder:
                 print(f"    ⚠️  dnf download failed: {e}")
 
         # Try yumdownloader
-        if shutil.which("yumdownloader"):
+        if which("yumdownloader"):
             try:
                 result = subprocess.run(
                     ["yumdownloader", "--source", "--destdir",
@@ -254,10 +332,7 @@ class KojiRebuilder:
 
         # Unpack SRPM
         try:
-            subprocess.run(
-                ["rpm", "-i", "--define", f"_topdir {pkg_dir}", str(srpm_path)],
-                capture_output=True, text=True, check=True
-            )
+            self._unpack_srpm(srpm_path, pkg_dir)
         except subprocess.CalledProcessError as e:
             print(f"  ⚠️  Failed to unpack {srpm_path.name}: {e}")
             return None
@@ -269,28 +344,31 @@ class KojiRebuilder:
             return None
 
         spec_file = specs[0]
-        content = spec_file.read_text()
+        # surrogateescape: specs aren't guaranteed UTF-8, and any stray
+        # bytes must survive the round trip unchanged
+        original = spec_file.read_text(encoding="utf-8", errors="surrogateescape")
 
         # ── Rebrand the spec ────────────────────────────────
         original_name = pkg_name
         new_name = pkg_name
 
         # Replace package names
-        upstream_prefixes = ["centos-stream-", "centos-", "rocky-", "almalinux-"]
-        for prefix in upstream_prefixes:
+        for prefix in self._UPSTREAM_PREFIXES:
             if pkg_name.startswith(prefix):
                 suffix = pkg_name[len(prefix):]
                 new_name = f"{self.os_id}-{suffix}"
                 break
 
         # Replace in spec content
-        content = self._rebrand_spec_content(content, original_name, new_name)
+        content = self._rebrand_spec_content(original, original_name, new_name)
 
-        # Write patched spec
-        new_spec = spec_file.parent / f"{new_name}.spec"
-        new_spec.write_text(content)
+        # Write patched spec: a rename instead of write + unlink, and no
+        # write at all if the text came out the same
+        new_spec = spec_file.with_name(f"{new_name}.spec")
         if new_spec != spec_file:
-            spec_file.unlink()
+            spec_file.rename(new_spec)
+        if content != original:
+            new_spec.write_text(content, encoding="utf-8", errors="surrogateescape")
 
         print(f"  → {original_name} → {new_name}")
         return {
@@ -300,36 +378,47 @@ class KojiRebuilder:
             "original": original_name,
         }
 
-    def _rebrand_spec_content(self, content, original_name, new_name):
-        """Replace upstream branding in a spec file."""
-
-        # Package name
-        content = re.sub(
-            rf"^Name:\s+{re.escape(original_name)}",
-            f"Name:           {new_name}",
-            content, flags=re.MULTILINE
+    @staticmethod
+    def _unpack_srpm(srpm_path, pkg_dir):
+        """
+        Unpack an SRPM into pkg_dir/SPECS + SOURCES, the layout `rpm -i`
+        gives, as a plain rpm2cpio | cpio extraction: no rpm transaction,
+        signature check or rpmdb in the way. The archive is flat.
+        """
+        sources = pkg_dir / "SOURCES"
+        specs = pkg_dir / "SPECS"
+        sources.mkdir(parents=True, exist_ok=True)
+        specs.mkdir(exist_ok=True)
+
+        rpm2cpio = subprocess.Popen(
+            ["rpm2cpio", str(srpm_path)],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
         )
-
-        # Vendor
-        content = re.sub(
-            r"^Vendor:\s+.*$",
-            f"Vendor:         {self.vendor}",
-            content, flags=re.MULTILINE
+        cpio = subprocess.run(
+            ["cpio", "-idm", "--quiet"],
+            stdin=rpm2cpio.stdout, cwd=sources, capture_output=True, text=True
         )
-        if "Vendor:" not in content:
-            content = re.sub(
-                r"(^Name:.*$)",
-                rf"\1\nVendor:         {self.vendor}",
-                content, flags=re.MULTILINE
+        rpm2cpio.stdout.close()
+        rpm2cpio_err = rpm2cpio.stderr.read().decode(errors="replace")
+        rpm2cpio.stderr.close()
+        if rpm2cpio.wait() != 0:
+            raise subprocess.CalledProcessError(
+                rpm2cpio.returncode, "rpm2cpio", stderr=rpm2cpio_err
             )
+        if cpio.returncode != 0:
+            raise subprocess.CalledProcessError(cpio.returncode, "cpio", stderr=cpio.stderr)
 
-        # Summary / Description references
-        upstream_names = [
-            "CentOS Stream", "CentOS Linux", "CentOS",
-            "Rocky Linux", "AlmaLinux", "Red Hat Enterprise Linux",
-        ]
-        for uname in upstream_names:
-            content = content.replace(uname, self.name)
+        for spec in sources.glob("*.spec"):
+            spec.rename(specs / spec.name)
+
+    def _rebrand_spec_content(self, content, original_name, new_name):
+        """
+        Replace upstream branding in a spec file. One pass of
+        _SPEC_EDIT_RE; each match is rewritten according to its group.
+        """
+        name_re = re.compile(rf"Name:\s+{re.escape(original_name)}")
+        vendor_line = f"Vendor:         {self.vendor}"
+        add_vendor = "Vendor:" not in content
 
         # Provides/Obsoletes for clean upgrade path
         provides_block = (
@@ -339,14 +428,6 @@ class KojiRebuilder:
             f"Conflicts:      {original_name}\n"
         )
 
-        # Add after Release: line
-        content = re.sub(
-            r"(^Release:.*$)",
-            rf"\1{provides_block}",
-            content, count=1, flags=re.MULTILINE
-        )
-
-        # Add changelog entry
         today = datetime.now().strftime("%a %b %d %Y")
         changelog_entry = (
             f"\n%changelog\n"
@@ -355,15 +436,34 @@ class KojiRebuilder:
             f"- All upstream trademarks replaced with {self.name}\n"
         )
 
-        if "%changelog" in content:
-            content = re.sub(
-                r"%changelog",
-                changelog_entry.lstrip("\n"),
-                content, count=1
-            )
-        else:
+        # Only the first Release: line and %changelog get an insertion
+        pending = {"release", "changelog"}
+
+        def rebrand(text):
+            return _UPSTREAM_NAMES_RE.sub(lambda m: self.name, text)
+
+        def edit(m):
+            kind, text = m.lastgroup, m.group()
+            if kind == "brand":
+                return self.name
+            if kind == "vendor":
+                return vendor_line
+            if kind == "name":
+                renamed = name_re.match(text)
+                if renamed:
+                    text = f"Name:           {new_name}" + text[renamed.end():]
+                text = rebrand(text)
+                return f"{text}\n{vendor_line}" if add_vendor else text
+            if kind in pending:
+                pending.discard(kind)
+                if kind == "release":
+                    return rebrand(text) + provides_block
+                return changelog_entry.lstrip("\n")
+            return rebrand(text)
+
+        content = _SPEC_EDIT_RE.sub(edit, content)
+        if "changelog" in pending:
             content += changelog_entry
-
         return content
 
     def _inject_assets(self):
@@ -376,85 +476,96 @@ class KojiRebuilder:
         if not assets_path.is_dir():
             return
 
-        # Copy logos into any logo package build
-        logos_src = assets_path / "logos"
-        if logos_src.is_dir():
-            for spec_dir in self.specs_dir.iterdir():
-                if "logo" in spec_dir.name:
-                    sources = spec_dir / "SOURCES"
-                    sources.mkdir(parents=True, exist_ok=True)
-                    for f in logos_src.iterdir():
-                        if f.is_file():
-                            shutil.copy2(f, sources / f.name)
-                    print(f"  → Injected logos into {spec_dir.name}")
-
-        # Copy backgrounds
-        bg_src = assets_path / "backgrounds"
-        if bg_src.is_dir():
-            for spec_dir in self.specs_dir.iterdir():
-                if "background" in spec_dir.name:
-                    sources = spec_dir / "SOURCES"
-                    sources.mkdir(parents=True, exist_ok=True)
-                    for f in bg_src.iterdir():
-                        if f.is_file():
-                            shutil.copy2(f, sources / f.name)
-                    print(f"  → Injected backgrounds into {spec_dir.name}")
+        # Logos into any logo package build, backgrounds into any
+        # background one. rpmbuild only reads SOURCES, so hardlinks do.
+        spec_dirs = [e for e in os.scandir(self.specs_dir) if e.is_dir()]
+        for subdir, marker in (("logos", "logo"), ("backgrounds", "background")):
+            src = assets_path / subdir
+            if not src.is_dir():
+                continue
+            files = [e for e in os.scandir(src) if e.is_file()]
+            for spec_dir in spec_dirs:
+                if marker in spec_dir.name:
+                    # SOURCES already exists: _unpack_srpm creates it
+                    sources = Path(spec_dir.path) / "SOURCES"
+                    for f in files:
+                        link_or_copy(f.path, sources / f.name)
+                    print(f"  → Injected {subdir} into {spec_dir.name}")
 
     def _build_rpms(self, specs):
         """Build RPMs from patched specs using mock or koji."""
         print(f"⚙️  Building RPMs ({self.backend})...")
 
+        build = self._build_with_koji if self.backend == "koji" else self._build_with_mock
+
+        # Packages are independent; mock chroots are kept apart with
+        # --uniqueext and koji tasks are watched concurrently
         built = []
-        for spec_info in specs:
-            if self.backend == "koji":
-                rpms = self._build_with_koji(spec_info)
-            else:
-                rpms = self._build_with_mock(spec_info)
-            built.extend(rpms)
+        workers = max(1, min(len(specs), self.jobs))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for rpms in pool.map(build, specs):
+                built.extend(rpms)
 
         print(f"  ✅ {len(built)} RPMs built")
         return built
 
-    def _build_with_mock(self, spec_info):
-        """Build an RPM using mock (local chroot build)."""
-        spec = spec_info["spec"]
-        topdir = spec_info["topdir"]
-        name = spec_info["name"]
-
-        print(f"  → Building {name} with mock...")
+    def _build_srpm(self, spec_info):
+        """
+        Pack the patched spec + SOURCES (including injected assets) into an
+        SRPM, once per package; both backends rebuild from it. --nodeps:
+        BuildRequires are resolved in the mock chroot / on the Koji builder,
+        not on this host.
+        """
+        if spec_info.get("srpm"):
+            return spec_info["srpm"]
 
-        # First build the SRPM
+        topdir = spec_info["topdir"]
         try:
             result = subprocess.run(
                 [
-                    "rpmbuild", "-bs",
+                    "rpmbuild", "-bs", "--nodeps",
                     "--define", f"_topdir {topdir}",
-                    str(spec)
+                    str(spec_info["spec"])
                 ],
                 capture_output=True, text=True, check=True
             )
         except subprocess.CalledProcessError as e:
             print(f"    ⚠️  SRPM build failed: {e.stderr[:200]}")
-            return []
+            return None
+
+        # rpmbuild reports what it wrote; fall back to looking
+        match = re.search(r"^Wrote:\s+(\S+\.src\.rpm)$", result.stdout, re.MULTILINE)
+        srpm = Path(match.group(1)) if match else next((topdir / "SRPMS").glob("*.src.rpm"), None)
+        if not srpm:
+            print(f"    ⚠️  No SRPM produced for {spec_info['name']}")
+            return None
+
+        spec_info["srpm"] = srpm
+        return srpm
 
-        # Find built SRPM
-        new_srpms = list((topdir / "SRPMS").glob("*.src.rpm"))
-        if not new_srpms:
-            print(f"    ⚠️  No SRPM produced for {name}")
+    def _build_with_mock(self, spec_info):
+        """Build an RPM using mock (local chroot build)."""
+        name = spec_info["name"]
+
+        print(f"  → Building {name} with mock...")
+
+        srpm = self._build_srpm(spec_info)
+        if not srpm:
             return []
 
         # Build with mock
         try:
-            result = subprocess.run(
+            result = _run_streaming(
                 [
                     "mock", "-r", self.mock_config,
-                    "--rebuild", str(new_srpms[0]),
+                    f"--uniqueext={name}",
+                    "--rebuild", str(srpm),
                     "--resultdir", str(self.rpms_dir / name),
                 ],
-                capture_output=True, text=True, timeout=600
+                timeout=600
             )
             if result.returncode != 0:
-                print(f"    ⚠️  mock build failed: {result.stderr[:300]}")
+                print(f"    ⚠️  mock build failed: {result.stderr[-300:]}")
                 return []
         except subprocess.TimeoutExpired:
             print(f"    ⚠️  mock build timed out for {name}")
@@ -469,8 +580,6 @@ class KojiRebuilder:
 
     def _build_with_koji(self, spec_info):
         """Build an RPM using Koji build system."""
-        spec = spec_info["spec"]
-        topdir = spec_info["topdir"]
         name = spec_info["name"]
 
         if not self.koji_hub:
@@ -480,41 +589,28 @@ class KojiRebuilder:
 
         print(f"  → Submitting {name} to Koji...")
 
-        # Build SRPM first
-        try:
-            subprocess.run(
-                [
-                    "rpmbuild", "-bs",
-                    "--define", f"_topdir {topdir}",
-                    str(spec)
-                ],
-                capture_output=True, text=True, check=True
-            )
-        except subprocess.CalledProcessError as e:
-            print(f"    ⚠️  SRPM build failed: {e.stderr[:200]}")
-            return []
-
-        new_srpms = list((topdir / "SRPMS").glob("*.src.rpm"))
-        if not new_srpms:
+        srpm = self._build_srpm(spec_info)
+        if not srpm:
             return []
 
         # Submit to Koji
         tag = self.koji_tag or f"{self.os_id}-{self.version}-candidate"
         try:
-            result = subprocess.run(
+            # --nowait: submit only; the task is followed by watch-task
+            result = _run_streaming(
                 [
                     "koji", "--server", self.koji_hub,
-                    "build", "--scratch", tag,
-                    str(new_srpms[0])
+                    "build", "--scratch", "--nowait", tag,
+                    str(srpm)
                 ],
-                capture_output=True, text=True, timeout=1800
+                timeout=1800
             )
             if result.returncode != 0:
-                print(f"    ⚠️  Koji build failed: {result.stderr[:300]}")
+                print(f"    ⚠️  Koji build failed: {result.stderr[-300:]}")
                 return []
 
-            # Parse task ID from output
-            task_match = re.search(r"Task ID:\s+(\d+)", result.stdout)
+            # Parse task ID from output ("Created task: N")
+            task_match = re.search(r"(?:Created task|Task ID):\s+(\d+)", result.stdout)
             if task_match:
                 task_id = task_match.group(1)
                 print(f"    → Koji task: {task_id}")
@@ -534,19 +630,19 @@ class KojiRebuilder:
 
         try:
             # Wait for task
-            subprocess.run(
+            _run_streaming(
                 ["koji", "--server", self.koji_hub, "watch-task", task_id],
-                capture_output=True, text=True, timeout=1800
+                timeout=1800
             )
 
             # Download results
-            subprocess.run(
+            _run_streaming(
                 [
                     "koji", "--server", self.koji_hub,
                     "download-task", "--arch=x86_64", "--arch=noarch",
                     task_id, "--dir", str(result_dir)
                 ],
-                capture_output=True, text=True, timeout=300
+                timeout=300
             )
 
             rpms = list(result_dir.glob("*.rpm"))
@@ -593,20 +689,23 @@ class KojiRebuilder:
         repo_dir = self.output_dir / "repo"
         repo_dir.mkdir(parents=True, exist_ok=True)
 
-        # Copy all RPMs to repo dir
+        # Link all RPMs into the repo dir (same inodes as rpms/)
         for rpm in rpms_dir.glob("**/*.rpm"):
             if not rpm.name.endswith(".src.rpm"):
-                shutil.copy2(rpm, repo_dir / rpm.name)
+                link_or_copy(rpm, repo_dir / rpm.name)
 
         # Create repo metadata
-        createrepo = "createrepo_c" if shutil.which("createrepo_c") else "createrepo"
-        if not shutil.which(createrepo):
+        createrepo = "createrepo_c" if which("createrepo_c") else "createrepo"
+        if not which(createrepo):
             print("  ⚠️  createrepo not found, skipping repo creation")
             return None
 
         try:
             subprocess.run(
-                [createrepo, str(repo_dir)],
+                # --update reuses metadata for unchanged RPMs on reruns;
+                # --workers spreads header reading over all cores
+                [createrepo, "--update", "--workers", str(os.cpu_count() or 1),
+                 str(repo_dir)],
                 capture_output=True, text=True, check=True
             )
             print(f"  ✅ Repo created: {repo_dir}")
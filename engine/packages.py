@@ -5,60 +5,164 @@ Modifies the ISO's package repository and comps.xml.
 
 import os
 import re
-import shutil
+import sys
+import time
+import tempfile
 import subprocess
-import xml.etree.ElementTree as ET
 from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from engine.fsutil import copy_file, which
+
+
+# Where ISOs keep repodata / RPMs, most common first (relative to the root)
+_REPODATA_CANDIDATES = (
+    "repodata", "BaseOS/repodata", "Packages/repodata", "AppStream/repodata",
+)
+_PACKAGES_CANDIDATES = ("Packages", "BaseOS/Packages", "AppStream/Packages")
+
+# Never hold repodata, so _find_repodata's tree search skips them
+_REPODATA_PRUNE = frozenset(("Packages", "isolinux", "images", "EFI"))
+
+# comps group files in repodata, optionally compressed
+_COMPS_RE = re.compile(r"comps.*\.xml(\.gz|\.xz|\.bz2|\.zst)?$", re.IGNORECASE)
+_UNSET = object()
+
+# Body of a yum .repo file; gpgkey= is appended when the repo has one
+_REPO_TEMPLATE = (
+    "[{name}]\n"
+    "name={name}\n"
+    "baseurl={baseurl}\n"
+    "enabled={enabled}\n"
+    "gpgcheck={gpgcheck}\n"
+)
+
+# createrepo's per-package counter ("  123/8000 - Packages/foo.rpm")
+_PROGRESS_RE = re.compile(rb"\s*(\d+)/(\d+)\b")
+# createrepo_c --verbose: the package total, then lines naming each package
+_WALK_DONE_RE = re.compile(rb"Directory walk done - (\d+) packages")
+_RPM_PATH_RE = re.compile(rb"([^\s/]+\.rpm)\b")
+_LINE_SPLIT_RE = re.compile(rb"[\r\n]")
+
+
+def _createrepo_cache_dir() -> Path:
+    """
+    Checksum cache shared by createrepo runs, in the user's cache dir (a
+    fixed name in world-writable /tmp could be pre-created by anyone).
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    path = Path(cache_home) / "distro-forge" / "createrepo"
+    path.mkdir(parents=True, exist_ok=True, mode=0o700)
+    return path
+
+
+def _find_createrepo():
+    """Path to createrepo_c, else classic createrepo, else None."""
+    return which("createrepo_c") or which("createrepo")
+
+
+def scan_local_rpms(local_rpms):
+    """
+    List the .rpm files in a local RPM directory, as os.DirEntry objects
+    sorted by name.
+    Independent of the ISO, so it can run while the ISO is extracting.
+    Returns None if the directory doesn't exist.
+    """
+    try:
+        it = os.scandir(local_rpms)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    # DirEntry carries d_type from the directory read, so is_file() only
+    # has to stat symlinks (which are still followed, like glob did)
+    with it:
+        rpm_files = [
+            entry for entry in it
+            if entry.name.endswith(".rpm") and not entry.name.startswith(".")
+            and entry.is_file()
+        ]
+    rpm_files.sort(key=lambda entry: entry.name)
+    return rpm_files
 
 
 class PackageEngine:
     """Handle package and repository modifications on the ISO."""
 
-    def __init__(self, iso_root: Path, manifest: dict):
+    def __init__(self, iso_root: Path, manifest: dict, local_rpm_files=None):
         self.iso_root = iso_root
         self.manifest = manifest
         self.packages = manifest.get("packages", {})
         self.repos = manifest.get("repos", [])
         self.repodata_dir = self._find_repodata()
+        # Result of scan_local_rpms(), if the caller already ran it
+        self._local_rpm_files = local_rpm_files
+        # Set when an injected RPM overwrote one already in the tree; the
+        # old repodata's size/mtime for that name is then stale
+        self._rpms_replaced = False
+        # Where _inject_local_rpms put each RPM, in name order
+        self._injected_rpms = []
+        self._comps_cache = _UNSET
+        self._report = []
+
+    def apply_all(self, flush=True):
+        """
+        Apply all package modifications. With flush=False the progress
+        report is left queued for the caller's flush_report().
+        """
+        self._log("⚙️  Configuring packages & repos...")
+        try:
+            self._inject_local_rpms()
+            self._rebuild_repodata()
 
-    def apply_all(self):
-        """Apply all package modifications."""
-        print("⚙️  Configuring packages & repos...")
+            self._log("  ✅ Packages configured")
+        finally:
+            if flush:
+                self.flush_report()
 
-        self._inject_local_rpms()
-        self._rebuild_repodata()
+    def _log(self, msg):
+        """Queue a progress line (see flush_report)."""
+        self._report.append(msg)
 
-        print("  ✅ Packages configured")
+    def flush_report(self):
+        """Emit the queued progress lines in a single write."""
+        if self._report:
+            sys.stdout.write("\n".join(self._report) + "\n")
+            sys.stdout.flush()
+            self._report.clear()
 
     def _find_repodata(self):
         """Find the repodata directory in the ISO."""
-        candidates = [
-            self.iso_root / "repodata",
-            self.iso_root / "BaseOS" / "repodata",
-            self.iso_root / "Packages" / "repodata",
-            self.iso_root / "AppStream" / "repodata",
-        ]
-        for path in candidates:
-            if path.is_dir():
-                return path
-
-        # Search recursively
-        for dirpath, dirnames, _ in os.walk(self.iso_root):
-            if "repodata" in dirnames:
-                return Path(dirpath) / "repodata"
+        root = str(self.iso_root)
+        for candidate in _REPODATA_CANDIDATES:
+            path = os.path.join(root, candidate)
+            if os.path.isdir(path):
+                return Path(path)
+
+        # Search breadth-first, so the shallowest repodata wins, without
+        # descending into the big leaf trees (Packages alone can hold
+        # thousands of entries)
+        queue = deque([root])
+        while queue:
+            try:
+                it = os.scandir(queue.popleft())
+            except OSError:
+                continue
+            with it:
+                subdirs = [e for e in it if e.is_dir(follow_symlinks=False)]
+            for entry in subdirs:
+                if entry.name == "repodata":
+                    return Path(entry.path)
+            queue.extend(e.path for e in subdirs if e.name not in _REPODATA_PRUNE)
 
         return None
 
     def _find_packages_dir(self):
         """Find where RPM packages live in the ISO."""
-        candidates = [
-            self.iso_root / "Packages",
-            self.iso_root / "BaseOS" / "Packages",
-            self.iso_root / "AppStream" / "Packages",
-        ]
-        for path in candidates:
-            if path.is_dir():
-                return path
+        root = str(self.iso_root)
+        for candidate in _PACKAGES_CANDIDATES:
+            path = os.path.join(root, candidate)
+            if os.path.isdir(path):
+                return Path(path)
 
         # Check for packages in repodata parent
         if self.repodata_dir:
@@ -74,9 +178,11 @@ class PackageEngine:
         if not local_rpms:
             return
 
-        rpm_src = Path(local_rpms)
-        if not rpm_src.is_dir():
-            print(f"  ⚠️  Local RPMs directory not found: {local_rpms}")
+        rpm_files = self._local_rpm_files
+        if rpm_files is None:
+            rpm_files = scan_local_rpms(local_rpms)
+        if rpm_files is None:
+            self._log(f"  ⚠️  Local RPMs directory not found: {local_rpms}")
             return
 
         packages_dir = self._find_packages_dir()
@@ -85,21 +191,35 @@ class PackageEngine:
             packages_dir = self.iso_root / "Packages"
             packages_dir.mkdir(parents=True, exist_ok=True)
 
-        rpm_files = list(rpm_src.glob("*.rpm"))
         if not rpm_files:
-            print(f"  ⚠️  No .rpm files found in {local_rpms}")
+            self._log(f"  ⚠️  No .rpm files found in {local_rpms}")
             return
 
+        # Copies are syscall-bound and release the GIL; overlapping them
+        # keeps the disk queue busy. Results come back in input order.
+        self._rpms_replaced = any(
+            (packages_dir / rpm.name).exists() for rpm in rpm_files
+        )
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(16, len(rpm_files))) as pool:
+            sizes = list(pool.map(
+                lambda rpm: copy_file(rpm, packages_dir / rpm.name), rpm_files
+            ))
+        elapsed = time.monotonic() - started
+
+        self._injected_rpms = [packages_dir / rpm.name for rpm in rpm_files]
         for rpm in rpm_files:
-            shutil.copy2(rpm, packages_dir / rpm.name)
-            print(f"  → Injected: {rpm.name}")
+            self._log(f"  → Injected: {rpm.name}")
 
-        print(f"  → {len(rpm_files)} RPMs injected")
+        total = sum(sizes)
+        rate = f", {total / 2**20 / elapsed:.0f} MiB/s" if elapsed > 0 else ""
+        self._log(f"  → {len(rpm_files)} RPMs injected "
+                  f"({total // 2**20} MiB{rate})")
 
     def _rebuild_repodata(self):
         """Rebuild the repository metadata after injecting RPMs."""
         if not self.repodata_dir:
-            print("  ⚠️  No repodata found, skipping rebuild")
+            self._log("  ⚠️  No repodata found, skipping rebuild")
             return
 
         repo_root = self.repodata_dir.parent
@@ -107,37 +227,139 @@ class PackageEngine:
         # Preserve comps.xml if it exists
         comps_file = self._find_comps()
 
-        if not shutil.which("createrepo_c") and not shutil.which("createrepo"):
-            print("  ⚠️  createrepo not found, skipping repodata rebuild")
-            print("    Install: dnf install createrepo_c")
+        createrepo = _find_createrepo()
+        if not createrepo:
+            self._log("  ⚠️  createrepo not found, skipping repodata rebuild")
+            self._log("    Install: dnf install createrepo_c")
             return
 
-        cmd = ["createrepo_c" if shutil.which("createrepo_c") else "createrepo"]
+        cmd = [createrepo]
 
         if comps_file:
             cmd += ["-g", str(comps_file)]
 
-        cmd += ["--update", str(repo_root)]
+        cmd += ["--update", "--workers", str(os.cpu_count() or 1)]
+        cmd += ["--cachedir", str(_createrepo_cache_dir())]
+        pkglist = None
+        if os.path.basename(createrepo) == "createrepo_c":
+            # Build the sqlite dbs on local disk, then move them in;
+            # --verbose is what makes it log per package (for progress)
+            cmd += ["--local-sqlite", "--verbose"]
+            pkglist = self._write_pkglist(repo_root)
+        if pkglist:
+            # Take the ISO's packages from the old metadata and only look
+            # at the injected ones, instead of walking the whole tree
+            cmd += ["--pkglist", pkglist, "--recycle-pkglist"]
+        if not self._rpms_replaced:
+            # Every name already in the old metadata is an untouched file
+            # from the ISO, so --update can trust it without a stat
+            cmd += ["--skip-stat"]
+        cmd += [str(repo_root)]
 
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode == 0:
-                print("  → Repodata rebuilt")
+            returncode, tail = self._run_createrepo(cmd, self._log)
+            if returncode == 0:
+                self._log("  → Repodata rebuilt")
             else:
-                print(f"  ⚠️  createrepo warning: {result.stderr[:200]}")
+                err = "\n".join(tail)[-200:]
+                self._log(f"  ⚠️  createrepo warning: {err}")
         except Exception as e:
-            print(f"  ⚠️  createrepo failed: {e}")
-
-    def _find_comps(self):
-        """Find the comps.xml file in repodata."""
-        if not self.repodata_dir:
+            self._log(f"  ⚠️  createrepo failed: {e}")
+        finally:
+            if pkglist:
+                os.unlink(pkglist)
+
+    def _write_pkglist(self, repo_root):
+        """
+        Write the injected RPMs that live under repo_root, as sorted,
+        repo-relative paths, to a temp file for --pkglist. Kept out of the
+        ISO tree. Returns its path, or None if there is nothing to list.
+        """
+        root = str(repo_root)
+        names = sorted({
+            os.path.relpath(path, root) for path in map(str, self._injected_rpms)
+            if path.startswith(root + os.sep)
+        })
+        if not names:
             return None
+        fd, path = tempfile.mkstemp(prefix="df-pkglist-", text=True)
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join(names) + "\n")
+        return path
+
+    @staticmethod
+    def _run_createrepo(cmd, log=print):
+        """
+        Run createrepo and print a progress line every 10% so a big repo
+        doesn't look hung: from classic createrepo's "N/TOTAL" counter, or
+        createrepo_c --verbose's package total and per-package lines,
+        each passed to log.
+        Output is read in raw chunks, since the counter is redrawn with a
+        carriage return rather than newline-terminated. Returns
+        (returncode, last few lines) -- nothing else is kept.
+        """
+        tail = deque(maxlen=4)
+        seen = set()
+        total = 0
+        shown = 0
+        pending = b""
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        with proc:
+            while True:
+                chunk = proc.stdout.read1(65536)
+                parts = _LINE_SPLIT_RE.split(pending + chunk)
+                # The last piece may be a partial line; hold it for the next read
+                pending = parts.pop() if chunk else b""
+                for part in parts:
+                    if not part.strip():
+                        continue
+                    match = _PROGRESS_RE.match(part)
+                    if match:
+                        done, total = int(match.group(1)), int(match.group(2))
+                    else:
+                        tail.append(part.decode("utf-8", "replace").strip())
+                        walk = _WALK_DONE_RE.search(part)
+                        if walk:
+                            total = int(walk.group(1))
+                            continue
+                        rpm = _RPM_PATH_RE.search(part)
+                        if not rpm or not total:
+                            continue
+                        seen.add(rpm.group(1))
+                        done = min(len(seen), total)
+                    percent = done * 100 // total if total else 0
+                    if percent >= shown + 10:
+                        shown = percent - percent % 10
+                        log(f"  → Repodata: {shown}% ({done}/{total})")
+                if not chunk:
+                    break
+        return proc.returncode, tail
 
-        for f in self.repodata_dir.iterdir():
-            if "comps" in f.name.lower() and f.name.endswith(".xml"):
-                return f
-
-        return None
+    def _find_comps(self):
+        """
+        Find the comps.xml file in repodata. A plain .xml is preferred;
+        a compressed one (.xml.gz/.xz, common on newer repos) is the
+        fallback. The answer is cached.
+        """
+        if self._comps_cache is not _UNSET:
+            return self._comps_cache
+
+        found = None
+        if self.repodata_dir:
+            with os.scandir(self.repodata_dir) as it:
+                for entry in it:
+                    match = _COMPS_RE.search(entry.name)
+                    if not match or not entry.is_file():
+                        continue
+                    if not match.group(1):
+                        found = Path(entry.path)
+                        break
+                    found = found or Path(entry.path)
+
+        self._comps_cache = found
+        return found
 
     def get_install_packages(self):
         """Get list of packages to install (for kickstart)."""
@@ -148,17 +370,17 @@ class PackageEngine:
         return self.packages.get("remove", [])
 
     def get_repo_configs(self):
-        """Generate yum .repo file content for custom repos."""
-        configs = []
+        """
+        Generate yum .repo file content for custom repos, one
+        {"name", "content"} dict at a time.
+        """
         for repo in self.repos:
-            config = (
-                f"[{repo['name']}]\n"
-                f"name={repo['name']}\n"
-                f"baseurl={repo['baseurl']}\n"
-                f"enabled={1 if repo.get('enabled', True) else 0}\n"
-                f"gpgcheck={1 if repo.get('gpgcheck', False) else 0}\n"
-            )
+            content = _REPO_TEMPLATE.format_map({
+                "name": repo["name"],
+                "baseurl": repo["baseurl"],
+                "enabled": 1 if repo.get("enabled", True) else 0,
+                "gpgcheck": 1 if repo.get("gpgcheck", False) else 0,
+            })
             if repo.get("gpgkey"):
-                config += f"gpgkey={repo['gpgkey']}\n"
-            configs.append({"name": repo["name"], "content": config})
-        return configs
+                content += f"gpgkey={repo['gpgkey']}\n"
+            yield {"name": repo["name"], "content": content}
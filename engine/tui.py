@@ -8,19 +8,44 @@ Requires: dialog or whiptail (pre-installed on most Linux systems)
   - macOS: brew install dialog
 """
 
-import os
-import sys
+import re
 import subprocess
-import tempfile
-import json
-from pathlib import Path
+from itertools import chain
+
+from engine.fsutil import which
+
+
+# Between the answers of --and-widget chained dialogs. Not whitespace
+# (str.strip() counts \x1c-\x1f as such), or _run_dialog's strip would eat
+# it when the first answer is empty
+_WIDGET_SEP = "\x01"
+
+
+# One item of a comma/space separated list (package names, services)
+_CSV_RE = re.compile(r"[^\s,]+")
+
+
+def _csv(text):
+    """Split a comma-separated answer into its non-empty items."""
+    return _CSV_RE.findall(text or "")
+
+
+def _find_backend():
+    """Find dialog or whiptail."""
+    for cmd in ("dialog", "whiptail"):
+        if which(cmd):
+            return cmd
+    return None
 
 
 class TUIWizard:
     """NCurses TUI wizard using dialog/whiptail."""
 
+    # Common to every widget call
+    _BASE_ARGS = ("--backtitle", "🔨 Distro Forge — RHEL/CentOS Distro Builder")
+
     def __init__(self):
-        self.backend = self._detect_backend()
+        self.backend = _find_backend()
         if not self.backend:
             raise RuntimeError(
                 "TUI requires 'dialog' or 'whiptail'. "
@@ -28,49 +53,50 @@ class TUIWizard:
             )
         self.manifest = {}
 
-    def _detect_backend(self):
-        """Find dialog or whiptail."""
-        for cmd in ["dialog", "whiptail"]:
-            if self._which(cmd):
-                return cmd
-        return None
-
-    @staticmethod
-    def _which(cmd):
-        """Check if command exists."""
-        try:
-            subprocess.run(
-                ["which", cmd], capture_output=True, check=True
-            )
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
-
     def _run_dialog(self, *args, **kwargs):
         """
         Run a dialog/whiptail command and return (returncode, output).
         Dialog writes user input to stderr.
         """
-        height = kwargs.get("height", 12)
-        width = kwargs.get("width", 60)
-
-        cmd = [self.backend]
-
         # whiptail needs --title before the widget
         title = kwargs.get("title", "Distro Forge")
-        cmd += ["--title", title]
-
-        # Backtitle
-        cmd += ["--backtitle", "🔨 Distro Forge — RHEL/CentOS Distro Builder"]
+        cmd = [self.backend, "--title", title, *self._BASE_ARGS, *args]
 
-        # Add the widget args
-        cmd += list(args)
+        if not kwargs.get("capture", True):
+            return subprocess.run(cmd).returncode, ""
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        # dialog outputs to stderr, whiptail also outputs to stderr
-        output = result.stderr.strip()
+        # The screen is drawn on stdout, which stays on the terminal;
+        # dialog and whiptail both write the answer to stderr
+        result = subprocess.run(cmd, stderr=subprocess.PIPE)
+        output = result.stderr.decode("utf-8", "replace")
+        if kwargs.get("strip", True):
+            output = output.strip()
         return result.returncode, output
 
+    def _chain(self, widgets, title="Distro Forge"):
+        """
+        Show several independent widgets back to back and return
+        (returncode, [output, ...]). dialog runs them all from one process
+        via --and-widget, so ncurses starts up once; whiptail has no
+        chaining and gets one process per widget. A cancel stops the chain.
+        """
+        if self.backend != "dialog":
+            outputs = []
+            for args in widgets:
+                rc, val = self._run_dialog(*args, title=title)
+                if rc != 0:
+                    return rc, outputs
+                outputs.append(val)
+            return 0, outputs
+
+        args = ["--separate-widget", _WIDGET_SEP]
+        for i, widget in enumerate(widgets):
+            if i:
+                args += ["--and-widget", "--title", title]
+            args += widget
+        rc, val = self._run_dialog(*args, title=title)
+        return rc, val.split(_WIDGET_SEP)
+
     def _inputbox(self, text, default="", title="Distro Forge", height=10, width=60):
         """Show an input box and return the entered text."""
         rc, val = self._run_dialog(
@@ -81,6 +107,35 @@ class TUIWizard:
             return None
         return val
 
+    def _form(self, text, fields, title="Distro Forge", width=70):
+        """
+        Ask several text fields on one screen. fields is a list of
+        (label, y, x, default, field_len, input_len) tuples. Returns
+        {label: value}, or None if cancelled. whiptail has no --form, so
+        there the fields are asked one inputbox at a time.
+        """
+        if self.backend != "dialog":
+            values = {}
+            for label, _, _, default, _, _ in fields:
+                val = self._inputbox(f"{label}:", default=default, title=title)
+                if val is None:
+                    return None
+                values[label] = val
+            return values
+
+        item_x = max(len(label) for label, *_ in fields) + 3
+        height = len(fields) + 8
+        args = ["--form", text, str(height), str(width), str(len(fields))]
+        for label, y, x, default, flen, ilen in fields:
+            args += [f"{label}:", str(y), str(x),
+                     default, str(y), str(x + item_x), str(flen), str(ilen)]
+        rc, val = self._run_dialog(*args, title=title, strip=False)
+        if rc != 0:
+            return None
+        # One line per field, in order; empty fields are empty lines
+        lines = val.split("\n") + [""] * len(fields)
+        return {f[0]: line.strip() for f, line in zip(fields, lines)}
+
     def _yesno(self, text, title="Distro Forge", height=8, width=50, default_yes=True):
         """Show a yes/no dialog. Returns True for Yes."""
         args = ["--yesno", text, str(height), str(width)]
@@ -95,8 +150,7 @@ class TUIWizard:
         Returns the selected tag.
         """
         args = ["--menu", text, str(height), str(width), str(menu_height)]
-        for tag, desc in choices:
-            args += [tag, desc]
+        args.extend(chain.from_iterable(choices))
         rc, val = self._run_dialog(*args, title=title)
         if rc != 0:
             return None
@@ -108,8 +162,7 @@ class TUIWizard:
         Returns list of selected tags.
         """
         args = ["--checklist", text, str(height), str(width), str(list_height)]
-        for tag, desc, state in choices:
-            args += [tag, desc, state]
+        args.extend(chain.from_iterable(choices))
         rc, val = self._run_dialog(*args, title=title)
         if rc != 0:
             return None
@@ -122,8 +175,7 @@ class TUIWizard:
         Returns the selected tag.
         """
         args = ["--radiolist", text, str(height), str(width), str(list_height)]
-        for tag, desc, state in choices:
-            args += [tag, desc, state]
+        args.extend(chain.from_iterable(choices))
         rc, val = self._run_dialog(*args, title=title)
         if rc != 0:
             return None
@@ -131,7 +183,9 @@ class TUIWizard:
 
     def _msgbox(self, text, title="Distro Forge", height=10, width=50):
         """Show a message box."""
-        self._run_dialog("--msgbox", text, str(height), str(width), title=title)
+        self._run_dialog(
+            "--msgbox", text, str(height), str(width), title=title, capture=False
+        )
 
     def _passwordbox(self, text, title="Distro Forge", height=10, width=50):
         """Show a password input box."""
@@ -181,21 +235,24 @@ class TUIWizard:
         self.manifest["build_mode"] = mode
 
         # ── Basic Info ──────────────────────────────────────
-        name = self._inputbox("Distro Name:", title="[1/9] Basic Info")
-        if not name:
+        info = self._form(
+            "Basic info",
+            [
+                ("Distro Name", 1, 1, "", 30, 64),
+                ("Version", 2, 1, "1.0", 30, 16),
+                ("Vendor / Organization", 3, 1, "", 30, 128),
+                ("Bug Report URL (optional)", 4, 1, "", 30, 256),
+            ],
+            title="[1/9] Basic Info"
+        )
+        if not info or not info["Distro Name"]:
             return None
+        name = info["Distro Name"]
+        version = info["Version"]
         self.manifest["name"] = name
-
-        version = self._inputbox("Version:", default="1.0", title="[1/9] Basic Info")
-        if version is None:
-            return None
         self.manifest["version"] = version
-
-        vendor = self._inputbox("Vendor / Organization:", default="", title="[1/9] Basic Info")
-        self.manifest["vendor"] = vendor or ""
-
-        bug_url = self._inputbox("Bug Report URL (optional):", default="", title="[1/9] Basic Info")
-        self.manifest["bug_url"] = bug_url or ""
+        self.manifest["vendor"] = info["Vendor / Organization"]
+        self.manifest["bug_url"] = info["Bug Report URL (optional)"]
 
         # ── Base ISO / Upstream ─────────────────────────────
         if mode == "build_system":
@@ -347,8 +404,8 @@ class TUIWizard:
         )
 
         packages = {
-            "install": [p.strip() for p in (install_pkgs or "").split(",") if p.strip()],
-            "remove": [p.strip() for p in (remove_pkgs or "").split(",") if p.strip()],
+            "install": _csv(install_pkgs),
+            "remove": _csv(remove_pkgs),
             "local_rpms": None,
         }
 
@@ -372,30 +429,36 @@ class TUIWizard:
         else:
             kickstart["root_password"] = False
 
-        tz = self._inputbox("Default timezone:", default="UTC", title="[7/9] Kickstart")
-        kickstart["timezone"] = tz or "UTC"
-
-        lang = self._inputbox("Default language:", default="en_US.UTF-8", title="[7/9] Kickstart")
-        kickstart["lang"] = lang or "en_US.UTF-8"
-
-        kb = self._inputbox("Keyboard layout:", default="us", title="[7/9] Kickstart")
-        kickstart["keyboard"] = kb or "us"
+        locale = self._form(
+            "Installer locale",
+            [
+                ("Default timezone", 1, 1, "UTC", 30, 64),
+                ("Default language", 2, 1, "en_US.UTF-8", 30, 64),
+                ("Keyboard layout", 3, 1, "us", 30, 32),
+            ],
+            title="[7/9] Kickstart"
+        ) or {}
+        kickstart["timezone"] = locale.get("Default timezone") or "UTC"
+        kickstart["lang"] = locale.get("Default language") or "en_US.UTF-8"
+        kickstart["keyboard"] = locale.get("Keyboard layout") or "us"
 
         self.manifest["kickstart"] = kickstart
 
         # ── Advanced ────────────────────────────────────────
-        timeout = self._inputbox("Boot menu timeout (seconds):", default="60", title="[8/9] Advanced")
-        self.manifest["boot_timeout"] = int(timeout) if timeout and timeout.isdigit() else 60
-
-        selinux = self._radiolist(
-            "SELinux mode:",
+        # Timeout and SELinux don't depend on each other: one dialog run
+        rc, vals = self._chain(
             [
-                ("enforcing", "SELinux enforcing (recommended)", "on"),
-                ("permissive", "SELinux permissive", "off"),
-                ("disabled", "SELinux disabled", "off"),
+                ["--inputbox", "Boot menu timeout (seconds):", "10", "60", "60"],
+                ["--radiolist", "SELinux mode:", "18", "65", "8",
+                 "enforcing", "SELinux enforcing (recommended)", "on",
+                 "permissive", "SELinux permissive", "off",
+                 "disabled", "SELinux disabled", "off"],
             ],
             title="[8/9] Advanced"
         )
+        vals += [""] * (2 - len(vals))
+        timeout, selinux = vals[0].strip(), vals[1].strip('"')
+        self.manifest["boot_timeout"] = int(timeout) if timeout.isdigit() else 60
         self.manifest["selinux"] = selinux or "enforcing"
 
         if self._yesno("Enable firewall?", title="[8/9] Advanced"):
@@ -405,9 +468,7 @@ class TUIWizard:
                 default="ssh",
                 title="[8/9] Firewall Services"
             )
-            self.manifest["firewall_services"] = [
-                s.strip() for s in (svc or "ssh").split(",") if s.strip()
-            ]
+            self.manifest["firewall_services"] = _csv(svc or "ssh")
         else:
             self.manifest["firewall"] = False
             self.manifest["firewall_services"] = []
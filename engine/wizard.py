@@ -6,23 +6,154 @@ Supports two modes: Remaster (from ISO) and Build System (from scratch).
 
 import os
 import sys
+import glob
+import json
+import atexit
 from pathlib import Path
-
-
-def ask(prompt, default=None, required=True, validator=None):
-    """Ask a question with optional default and validation."""
+from functools import wraps
+
+
+# Wizard output waiting to be written. The terminal only has to show it
+# when we stop for an answer, so it goes out in one write per question
+# instead of one per line.
+_pending = []
+
+
+def _emit(text=""):
+    """Queue a line of wizard output (print replacement)."""
+    _pending.append(f"{text}\n")
+
+
+def _flush():
+    """Write out everything queued by _emit."""
+    if _pending:
+        sys.stdout.write("".join(_pending))
+        _pending.clear()
+    sys.stdout.flush()
+
+
+def _input(prompt):
+    """input() that first shows the queued output the prompt belongs to."""
+    _flush()
+    return input(prompt)
+
+
+# Where readline keeps answers between wizard runs (Up-arrow recalls them)
+_HISTORY_FILE = Path.home() / ".cache" / "distro-forge" / "wizard_history"
+
+# Last run's answers, offered as this run's defaults
+_DEFAULTS_FILE = _HISTORY_FILE.parent / "wizard_defaults.json"
+
+# Set while ask() is reading a path, so Tab completes file names
+_completing_paths = False
+_path_matches = []
+_readline_ready = False
+
+
+def _complete_path(text, state):
+    """readline completer: file names for path prompts, nothing otherwise."""
+    if not _completing_paths:
+        return None
+    if state == 0:
+        stem = os.path.expanduser(text)
+        _path_matches[:] = [
+            m + os.sep if os.path.isdir(m) else m
+            for m in sorted(glob.glob(glob.escape(stem) + "*"))
+        ]
+    return _path_matches[state] if state < len(_path_matches) else None
+
+
+def _save_history(readline):
+    """atexit hook: keep this run's answers for the next one."""
+    try:
+        readline.write_history_file(_HISTORY_FILE)
+    except OSError:
+        pass
+
+
+def _setup_readline():
+    """
+    Give input() persistent history and Tab path completion. Optional:
+    without the readline module (e.g. Windows) prompts just work as before.
+    """
+    global _readline_ready
+    if _readline_ready:
+        return
+    _readline_ready = True
+    try:
+        import readline
+    except ImportError:
+        return
+
+    try:
+        _HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+        readline.read_history_file(_HISTORY_FILE)
+    except OSError:
+        pass  # first run, or an unwritable home
+    readline.set_history_length(500)
+    atexit.register(_save_history, readline)
+
+    readline.set_completer(_complete_path)
+    readline.set_completer_delims(" \t\n")
+    if "libedit" in (readline.__doc__ or ""):
+        readline.parse_and_bind("bind ^I rl_complete")  # macOS
+    else:
+        readline.parse_and_bind("tab: complete")
+
+
+def _load_previous():
+    """The manifest saved by the last run, or {} if there's none usable."""
+    try:
+        prev = json.loads(_DEFAULTS_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+    return prev if isinstance(prev, dict) else {}
+
+
+def _previous(prev, *keys, default):
+    """prev[keys[0]][keys[1]]... as a prompt default, else default."""
+    value = prev
+    for key in keys:
+        if not isinstance(value, dict):
+            return default
+        value = value.get(key)
+    return default if value in (None, "") else str(value)
+
+
+def _save_previous(manifest):
+    """Remember this run's answers (never the root password) for next time."""
+    saved = dict(manifest)
+    if isinstance(saved.get("kickstart"), dict):
+        saved["kickstart"] = dict(saved["kickstart"], root_password_value=None)
+    try:
+        _DEFAULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        _DEFAULTS_FILE.write_text(json.dumps(saved, indent=2, default=str))
+    except OSError:
+        pass
+
+
+def ask(prompt, default=None, required=True, validator=None, complete_paths=False):
+    """
+    Ask a question with optional default and validation.
+    complete_paths turns on Tab completion of file names.
+    """
+    global _completing_paths
     suffix = f" [{default}]" if default else ""
     while True:
-        answer = input(f"  {prompt}{suffix}: ").strip()
+        _completing_paths = complete_paths
+        try:
+            answer = _input(f"  {prompt}{suffix}: ").strip()
+        finally:
+            _completing_paths = False
         if not answer and default is not None:
             answer = default
         if required and not answer:
-            print("    ⚠️  This field is required.")
+            _emit("    ⚠️  This field is required.")
             continue
         if validator:
             err = validator(answer)
             if err:
-                print(f"    ⚠️  {err}")
+                _emit(f"    ⚠️  {err}")
                 continue
         return answer
 
@@ -30,7 +161,7 @@ def ask(prompt, default=None, required=True, validator=None):
 def ask_yn(prompt, default="y"):
     """Yes/no question."""
     suffix = "(Y/n)" if default == "y" else "(y/N)"
-    answer = input(f"  {prompt} {suffix}: ").strip().lower()
+    answer = _input(f"  {prompt} {suffix}: ").strip().lower()
     if not answer:
         answer = default
     return answer in ("y", "yes")
@@ -38,12 +169,13 @@ def ask_yn(prompt, default="y"):
 
 def ask_choice(prompt, choices, default=1):
     """Multiple choice question."""
-    print(f"  {prompt}")
+    _emit(f"  {prompt}")
     for i, choice in enumerate(choices, 1):
         marker = "→" if i == default else " "
-        print(f"    {marker} ({i}) {choice}")
+        _emit(f"    {marker} ({i}) {choice}")
+    by_name = {c.lower(): c for c in choices}
     while True:
-        answer = input(f"  Choice [{default}]: ").strip()
+        answer = _input(f"  Choice [{default}]: ").strip()
         if not answer:
             return choices[default - 1]
         try:
@@ -52,20 +184,39 @@ def ask_choice(prompt, choices, default=1):
                 return choices[idx - 1]
         except ValueError:
             # Check if they typed the name directly
-            for c in choices:
-                if answer.lower() == c.lower():
-                    return c
-        print(f"    ⚠️  Pick 1-{len(choices)}")
+            hit = by_name.get(answer.lower())
+            if hit is not None:
+                return hit
+        _emit(f"    ⚠️  Pick 1-{len(choices)}")
 
 
 def ask_list(prompt, allow_empty=True):
     """Collect a comma-separated list."""
-    raw = input(f"  {prompt}: ").strip()
+    raw = _input(f"  {prompt}: ").strip()
     if not raw:
         return []
-    return [item.strip() for item in raw.split(",") if item.strip()]
+    return [s for s in (item.strip() for item in raw.split(",")) if s]
+
+
+def _remember_valid(validator):
+    """
+    Memoize a path validator's passes. Failures are not cached: the usual
+    fix for "not found" is to create/mount the path and retype it.
+    """
+    valid = set()
+
+    @wraps(validator)
+    def check(path):
+        if path in valid:
+            return None
+        err = validator(path)
+        if err is None:
+            valid.add(path)
+        return err
+    return check
 
 
+@_remember_valid
 def validate_iso_path(path):
     """Validate that the ISO path exists."""
     if not Path(path).exists():
@@ -75,6 +226,7 @@ def validate_iso_path(path):
     return None
 
 
+@_remember_valid
 def validate_dir_path(path):
     """Validate directory exists."""
     if path and not Path(path).is_dir():
@@ -84,11 +236,13 @@ def validate_dir_path(path):
 
 def run_wizard():
     """Run the interactive wizard and return a manifest dict."""
-    print("Let's build your distro. Answer the questions below.\n")
-    print("─" * 44)
+    _setup_readline()
+    prev = _load_previous()
+    _emit("Let's build your distro. Answer the questions below.\n")
+    _emit("─" * 44)
 
     # ── Step 0: Build Mode ──────────────────────────────────
-    print("\n🔧 Build Mode\n")
+    _emit("\n🔧 Build Mode\n")
     mode = ask_choice(
         "How do you want to build?",
         [
@@ -103,15 +257,26 @@ def run_wizard():
     manifest["build_mode"] = "build_system" if is_build_system else "remaster"
 
     # ── Step 1: Basic Info ──────────────────────────────────
-    print("\n📛 [1/9] Basic Info\n")
+    _emit("\n📛 [1/9] Basic Info\n")
     manifest["name"] = ask("Distro name", required=True)
-    manifest["version"] = ask("Version", default="1.0")
-    manifest["vendor"] = ask("Vendor / Organization", default="")
-    manifest["bug_url"] = ask("Bug report URL (optional)", default="", required=False)
+    manifest["version"] = ask("Version", default=_previous(prev, "version", default="1.0"))
+    manifest["vendor"] = ask(
+        "Vendor / Organization", default=_previous(prev, "vendor", default="")
+    )
+    manifest["bug_url"] = ask(
+        "Bug report URL (optional)",
+        default=_previous(prev, "bug_url", default=""),
+        required=False
+    )
+
+    # Defaults derived from the name/version, offered again in Step 3
+    default_os_id = manifest["name"].lower().replace(" ", "-")
+    default_grub_title = f"Install {manifest['name']}"
+    default_anaconda_title = f"{manifest['name']} {manifest['version']}"
 
     # ── Step 2: Base ISO or Upstream ────────────────────────
     if is_build_system:
-        print("\n🌐 [2/9] Upstream Source\n")
+        _emit("\n🌐 [2/9] Upstream Source\n")
         build_system = {}
 
         upstream = ask_choice(
@@ -128,7 +293,7 @@ def run_wizard():
 
         if "Custom" in upstream:
             build_system["upstream"] = "custom"
-            print("\n  Define your upstream repos:")
+            _emit("\n  Define your upstream repos:")
             custom_repos = {}
             while True:
                 repo_id = ask("    Repo ID (e.g. baseos)")
@@ -160,54 +325,56 @@ def run_wizard():
         manifest["build_system"] = build_system
 
     else:
-        print("\n💿 [2/9] Base ISO\n")
+        _emit("\n💿 [2/9] Base ISO\n")
         manifest["base_iso"] = ask(
             "Path to base RHEL/CentOS ISO",
             required=True,
-            validator=validate_iso_path
+            validator=validate_iso_path,
+            complete_paths=True
         )
 
     # ── Step 3: Branding ────────────────────────────────────
-    print("\n🎨 [3/9] Branding\n")
+    _emit("\n🎨 [3/9] Branding\n")
     branding = {}
     branding["os_name"] = manifest["name"]
     branding["os_id"] = ask(
         "OS ID (lowercase, no spaces)",
-        default=manifest["name"].lower().replace(" ", "-")
+        default=default_os_id
     )
 
     if ask_yn("Do you have a branding assets directory? (logos, splash, etc.)"):
         branding["assets_dir"] = ask(
             "Assets directory path",
-            validator=validate_dir_path
+            validator=validate_dir_path,
+            complete_paths=True
         )
-        print("    Expected structure:")
-        print("      assets/")
-        print("      ├── grub/        # GRUB theme files")
-        print("      ├── plymouth/    # Plymouth boot splash")
-        print("      ├── anaconda/    # Installer sidebar/topbar images")
-        print("      └── logos/       # OS logos (SVG/PNG)")
+        _emit("    Expected structure:")
+        _emit("      assets/")
+        _emit("      ├── grub/        # GRUB theme files")
+        _emit("      ├── plymouth/    # Plymouth boot splash")
+        _emit("      ├── anaconda/    # Installer sidebar/topbar images")
+        _emit("      └── logos/       # OS logos (SVG/PNG)")
     else:
         branding["assets_dir"] = None
-        print("    ℹ️  Will use text-based branding (no custom graphics)")
+        _emit("    ℹ️  Will use text-based branding (no custom graphics)")
 
     if ask_yn("Customize GRUB bootloader text?"):
-        branding["grub_title"] = ask("GRUB menu title", default=f"Install {manifest['name']}")
+        branding["grub_title"] = ask("GRUB menu title", default=default_grub_title)
     else:
-        branding["grub_title"] = f"Install {manifest['name']}"
+        branding["grub_title"] = default_grub_title
 
     if ask_yn("Customize Anaconda installer title?"):
         branding["anaconda_title"] = ask(
             "Anaconda title bar text",
-            default=f"{manifest['name']} {manifest['version']}"
+            default=default_anaconda_title
         )
     else:
-        branding["anaconda_title"] = f"{manifest['name']} {manifest['version']}"
+        branding["anaconda_title"] = default_anaconda_title
 
     manifest["branding"] = branding
 
     # ── Step 4: GUI ─────────────────────────────────────────
-    print("\n🖥️  [4/9] Desktop Environment\n")
+    _emit("\n🖥️  [4/9] Desktop Environment\n")
     gui = {}
     gui["enabled"] = ask_yn("Enable GUI (desktop environment)?")
     if gui["enabled"]:
@@ -223,11 +390,11 @@ def run_wizard():
     manifest["gui"] = gui
 
     # ── Step 5: Repos ───────────────────────────────────────
-    print("\n📦 [5/9] Custom Repositories\n")
+    _emit("\n📦 [5/9] Custom Repositories\n")
     repos = []
     if ask_yn("Add custom yum/dnf repositories?"):
         while True:
-            print(f"\n    Repo #{len(repos) + 1}:")
+            _emit(f"\n    Repo #{len(repos) + 1}:")
             repo = {}
             repo["name"] = ask("    Repo name/ID")
             repo["baseurl"] = ask("    Base URL")
@@ -243,20 +410,21 @@ def run_wizard():
     manifest["repos"] = repos
 
     # ── Step 6: Packages ────────────────────────────────────
-    print("\n📥 [6/9] Packages\n")
+    _emit("\n📥 [6/9] Packages\n")
     packages = {}
 
-    print("  Packages to INSTALL (comma-separated, or empty to skip):")
+    _emit("  Packages to INSTALL (comma-separated, or empty to skip):")
     packages["install"] = ask_list("  Install")
 
-    print("  Packages to REMOVE (comma-separated, or empty to skip):")
-    print("  Common: centos-logos, centos-release, centos-stream-release")
+    _emit("  Packages to REMOVE (comma-separated, or empty to skip):")
+    _emit("  Common: centos-logos, centos-release, centos-stream-release")
     packages["remove"] = ask_list("  Remove")
 
     if ask_yn("Install custom RPMs from a local directory?", default="n"):
         packages["local_rpms"] = ask(
             "Path to directory containing .rpm files",
-            validator=validate_dir_path
+            validator=validate_dir_path,
+            complete_paths=True
         )
     else:
         packages["local_rpms"] = None
@@ -264,39 +432,52 @@ def run_wizard():
     manifest["packages"] = packages
 
     # ── Step 7: Kickstart ───────────────────────────────────
-    print("\n📝 [7/9] Kickstart Configuration\n")
+    _emit("\n📝 [7/9] Kickstart Configuration\n")
     kickstart = {}
     if ask_yn("Use a custom kickstart template?", default="n"):
-        kickstart["template"] = ask("Path to kickstart template (.cfg)")
+        kickstart["template"] = ask("Path to kickstart template (.cfg)", complete_paths=True)
     else:
         kickstart["template"] = None
-        print("    ℹ️  Will generate a default kickstart")
+        _emit("    ℹ️  Will generate a default kickstart")
 
     kickstart["root_password"] = ask_yn("Set a default root password?", default="n")
     if kickstart["root_password"]:
         import getpass
+        _flush()
         kickstart["root_password_value"] = getpass.getpass("    Root password: ")
     else:
         kickstart["root_password_value"] = None
 
-    kickstart["timezone"] = ask("Default timezone", default="UTC")
-    kickstart["lang"] = ask("Default language", default="en_US.UTF-8")
-    kickstart["keyboard"] = ask("Keyboard layout", default="us")
+    kickstart["timezone"] = ask(
+        "Default timezone",
+        default=_previous(prev, "kickstart", "timezone", default="UTC")
+    )
+    kickstart["lang"] = ask(
+        "Default language",
+        default=_previous(prev, "kickstart", "lang", default="en_US.UTF-8")
+    )
+    kickstart["keyboard"] = ask(
+        "Keyboard layout",
+        default=_previous(prev, "kickstart", "keyboard", default="us")
+    )
 
     manifest["kickstart"] = kickstart
 
     # ── Step 8: Advanced ────────────────────────────────────
-    print("\n⚙️  [8/9] Advanced Options\n")
+    _emit("\n⚙️  [8/9] Advanced Options\n")
 
     if ask_yn("Customize boot menu timeout?", default="n"):
-        manifest["boot_timeout"] = int(ask("Timeout in seconds", default="60"))
+        manifest["boot_timeout"] = int(ask(
+            "Timeout in seconds",
+            default=_previous(prev, "boot_timeout", default="60")
+        ))
     else:
         manifest["boot_timeout"] = 60
 
     if ask_yn("Add post-install scripts?", default="n"):
         scripts = []
         while True:
-            script_path = ask("    Script path")
+            script_path = ask("    Script path", complete_paths=True)
             scripts.append(script_path)
             if not ask_yn("    Add another?", default="n"):
                 break
@@ -323,9 +504,9 @@ def run_wizard():
         manifest["firewall_services"] = []
 
     # ── Step 9: Source Rebuild (Koji/Mock) ─────────────────
-    print("\n🔧 [9/10] Source Rebuild (Optional)\n")
-    print("  Rebuild branding RPMs from source (centos-release, logos, etc.)")
-    print("  This replaces upstream packages with your own branded versions.\n")
+    _emit("\n🔧 [9/10] Source Rebuild (Optional)\n")
+    _emit("  Rebuild branding RPMs from source (centos-release, logos, etc.)")
+    _emit("  This replaces upstream packages with your own branded versions.\n")
 
     rebuild = {}
     if ask_yn("Rebuild branding RPMs from source?", default="n"):
@@ -361,12 +542,15 @@ def run_wizard():
     manifest["rebuild"] = rebuild
 
     # ── Step 10: Output ─────────────────────────────────────
-    print("\n📤 [10/10] Output\n")
+    _emit("\n📤 [10/10] Output\n")
     if ask_yn("Generate sample branding assets structure?", default="n"):
         manifest["generate_sample_assets"] = True
     else:
         manifest["generate_sample_assets"] = False
 
-    print("\n" + "─" * 44)
+    _emit("\n" + "─" * 44)
+    _flush()
+
+    _save_previous(manifest)
 
     return manifest
@@ -7,15 +7,18 @@ or composing from scratch using upstream repos.
 
 import os
 import sys
-import shutil
+import hashlib
+import importlib.util
+import json
+import logging
 import argparse
 from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from engine.wizard import run_wizard
-
 BANNER = r"""
 ╔══════════════════════════════════════════════╗
 ║  🔨 Distro Forge                             ║
@@ -26,8 +29,163 @@ BANNER = r"""
 ║    Build     — Compose from upstream repos   ║
 ╚══════════════════════════════════════════════╝
 """
+# What print(BANNER) would write, pre-encoded for UTF-8 terminals
+_BANNER_BYTES = (BANNER + "\n").encode("utf-8")
+
+# Sample asset templates written by generate_sample_assets
+_GRUB_THEME_TXT = """\
+# GRUB Theme — customize this
+# See: https://www.gnu.org/software/grub/manual/grub/html_node/Theme-file-format.html
+
+title-text: ""
+desktop-color: "#1a1a2e"
+terminal-font: "DejaVu Sans Mono Regular 14"
+
++ boot_menu {
+  left = 15%
+  top = 25%
+  width = 70%
+  height = 50%
+  item_font = "DejaVu Sans Regular 16"
+  item_color = "#cccccc"
+  selected_item_color = "#ffffff"
+  item_height = 30
+  item_spacing = 5
+}
+"""
+
+_PLYMOUTH_README = """\
+# Plymouth Boot Splash
+
+Place your Plymouth theme files here:
+- `*.plymouth` — theme descriptor
+- `*.script` — animation script
+- `*.png` — splash images / logo
+
+Example minimal theme:
+```
+[Plymouth Theme]
+Name=MyDistro
+Description=MyDistro boot splash
+ModuleName=script
+
+[script]
+ImageDir=/usr/share/plymouth/themes/mydistro
+ScriptFile=/usr/share/plymouth/themes/mydistro/mydistro.script
+```
+"""
+
+_ANACONDA_README = """\
+# Anaconda Installer Branding
+
+Place your installer images here:
+- `sidebar-logo.png` — sidebar logo (approximately 300x600)
+- `topbar-bg.png` — topbar background
+- `banner-bg.png` — banner background
+- `progress-first.png` — install progress first screen
+
+These get packed into `product.img` and overlaid
+on the Anaconda installer at boot time.
+"""
+
+_LOGOS_README = """\
+# OS Logos
+
+Place your distro logos here:
+- `logo.png` — main logo (256x256 recommended)
+- `logo.svg` — vector logo
+- `logo-small.png` — small variant (64x64)
+- `watermark.png` — GNOME/GDM watermark
+- `favicon.ico` — for any web interfaces
+"""
+
+
+@lru_cache(maxsize=1)
+def _load_yaml():
+    """PyYAML, imported on first use: --help/--check-deps never need it."""
+    import yaml
+    return yaml
+
+
+# Tools reported by --check-deps / --check-deps-json
+_REQUIRED_TOOLS = {
+    "python3": "Python 3.8+",
+    "xorriso": "ISO creation & extraction",
+    "createrepo_c": "Repository metadata (fallback: createrepo)",
+}
+
+_OPTIONAL_TOOLS = {
+    "lorax": "Build system — compose install trees",
+    "pungi-koji": "Build system — full production composes",
+    "mock": "Build system — RPM building in chroot",
+    "mksquashfs": "Product.img for Anaconda branding",
+    "isohybrid": "USB-bootable ISO creation",
+    "implantisomd5": "ISO integrity checksums",
+    "isoinfo": "Read ISO volume information",
+    "7z": "Alternative ISO extraction",
+}
+
+# Parsed -c manifests, keyed by path and validated by mtime + size, so
+# re-running against an unchanged manifest skips the YAML parse
+_MANIFEST_CACHE = Path.home() / ".cache" / "distro-forge" / "manifests"
+
+
+def _load_manifest(config_path):
+    """
+    Parse a manifest YAML, reusing the cached parse if it's unchanged.
+    The cache is plain JSON (never pickle: this often runs as root
+    against a user-writable ~/.cache).
+    """
+    st = config_path.stat()
+    stamp = [st.st_mtime_ns, st.st_size]
+    key = hashlib.sha1(str(config_path.resolve()).encode()).hexdigest()
+    cache_file = _MANIFEST_CACHE / f"{key}.json"
+
+    try:
+        with open(cache_file) as f:
+            cached = json.load(f)
+        if cached["stamp"] == stamp:
+            return cached["manifest"]
+    except Exception:
+        pass  # no cache yet, or unreadable: parse below
+
+    yaml = _load_yaml()
+    # libyaml's C loader when PyYAML was built with it
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(config_path) as f:
+        manifest = yaml.load(f, Loader=loader)
+
+    try:
+        data = json.dumps({"stamp": stamp, "manifest": manifest})
+        # Only cache what JSON round-trips exactly (YAML dates and
+        # non-string keys don't), so a cache hit is the same manifest
+        if json.loads(data)["manifest"] != manifest:
+            return manifest
+        _MANIFEST_CACHE.mkdir(parents=True, exist_ok=True, mode=0o700)
+        tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}")
+        tmp.write_text(data)
+        os.replace(tmp, cache_file)
+    except (OSError, TypeError, ValueError):
+        pass
+    return manifest
+
+
+def _print_banner():
+    """print(BANNER), minus the per-run encode on the usual UTF-8 stdout."""
+    buffer = getattr(sys.stdout, "buffer", None)
+    encoding = (getattr(sys.stdout, "encoding", None) or "").lower()
+    if buffer is None or encoding.replace("-", "") != "utf8":
+        print(BANNER)
+        return
+    sys.stdout.flush()  # keep ordering with anything already written as text
+    buffer.write(_BANNER_BYTES)
+    buffer.flush()
+
 
 def main():
+    # Engines that log (rather than print) report progress on stdout
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+
     parser = argparse.ArgumentParser(
         description="Distro Forge — Build your own RHEL/CentOS-based distro"
     )
@@ -56,6 +214,11 @@ def main():
         help="Check if all required tools are installed and exit",
         action="store_true"
     )
+    parser.add_argument(
+        "--check-deps-json",
+        help="Like --check-deps, but print one JSON object and no banner",
+        action="store_true"
+    )
     parser.add_argument(
         "--tui",
         help="Use TUI (ncurses) wizard instead of plain text",
@@ -68,7 +231,12 @@ def main():
     )
     args = parser.parse_args()
 
-    print(BANNER)
+    # Machine-readable: nothing but the JSON line on stdout
+    if args.check_deps_json:
+        check_dependencies_json()
+        sys.exit(0)
+
+    _print_banner()
 
     # ── Generate sample assets ──────────────────────────────
     if args.generate_assets:
@@ -82,18 +250,17 @@ def main():
 
     # ── Collect config ──────────────────────────────────────
     if args.config:
-        import yaml
         config_path = Path(args.config)
         if not config_path.exists():
             print(f"❌ Config file not found: {args.config}")
             sys.exit(1)
-        with open(config_path) as f:
-            manifest = yaml.safe_load(f)
+        manifest = _load_manifest(config_path)
         print(f"📄 Loaded manifest: {args.config}")
     elif args.tui:
         from engine.tui import run_tui_wizard
         manifest = run_tui_wizard()
     else:
+        from engine.wizard import run_wizard
         manifest = run_wizard()
 
     if not manifest:
@@ -108,20 +275,23 @@ def main():
 
     # ── Optionally save config ──────────────────────────────
     if args.save_config and not args.config:
-        import yaml
+        yaml = _load_yaml()
         save_path = Path(args.output) / f"{manifest['name']}-{manifest['version']}-manifest.yaml"
         save_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Don't save passwords to YAML
-        save_manifest = manifest.copy()
-        if "kickstart" in save_manifest:
-            ks = save_manifest["kickstart"].copy()
-            if ks.get("root_password_value"):
-                ks["root_password_value"] = "REDACTED"
-            save_manifest["kickstart"] = ks
+        # Don't save passwords to YAML; only the kickstart dict is rebuilt,
+        # everything else is shared with the live manifest
+        save_manifest = {
+            k: dict(v, root_password_value="REDACTED")
+            if k == "kickstart" and v.get("root_password_value") else v
+            for k, v in manifest.items()
+        }
 
         with open(save_path, "w") as f:
-            yaml.dump(save_manifest, f, default_flow_style=False, sort_keys=False)
+            # libyaml's C emitter when PyYAML was built with it
+            dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+            yaml.dump(save_manifest, f, Dumper=dumper,
+                      default_flow_style=False, sort_keys=False)
         print(f"💾 Manifest saved: {save_path}")
 
     # ── Show summary ────────────────────────────────────────
@@ -169,8 +339,8 @@ def main():
     if build_mode == "build_system":
         # Build from scratch
         from engine.buildsystem import BuildSystem
-        builder = BuildSystem(manifest, output_dir)
         try:
+            builder = BuildSystem(manifest, output_dir)
             iso_path = builder.run()
             print(f"\n✅ Done! → {iso_path}")
         except Exception as e:
@@ -179,8 +349,8 @@ def main():
     else:
         # Remaster existing ISO
         from engine.builder import Builder
-        builder = Builder(manifest, output_dir)
         try:
+            builder = Builder(manifest, output_dir)
             iso_path = builder.run()
             print(f"\n✅ Done! → {iso_path}")
         except Exception as e:
@@ -190,6 +360,7 @@ def main():
 
 def print_summary(manifest):
     """Print a human-readable summary of the build config."""
+    out = []
     build_mode = manifest.get("build_mode", "remaster")
 
     gui_str = "Disabled"
@@ -200,93 +371,104 @@ def print_summary(manifest):
     pkgs_install = manifest.get("packages", {}).get("install", [])
     pkgs_remove = manifest.get("packages", {}).get("remove", [])
 
-    print("\n" + "─" * 50)
-    print("📋 Build Summary")
-    print("─" * 50)
-    print(f"  Mode:      {'🔨 Build System' if build_mode == 'build_system' else '💿 Remaster'}")
-    print(f"  Name:      {manifest['name']} {manifest['version']}")
+    out.append("\n" + "─" * 50)
+    out.append("📋 Build Summary")
+    out.append("─" * 50)
+    out.append(f"  Mode:      {'🔨 Build System' if build_mode == 'build_system' else '💿 Remaster'}")
+    out.append(f"  Name:      {manifest['name']} {manifest['version']}")
 
     if build_mode == "build_system":
         bs = manifest.get("build_system", {})
-        print(f"  Upstream:  {bs.get('upstream', 'unknown')}")
-        print(f"  Arch:      {bs.get('arch', 'x86_64')}")
-        print(f"  Tool:      {bs.get('tool', 'lorax')}")
+        out.append(f"  Upstream:  {bs.get('upstream', 'unknown')}")
+        out.append(f"  Arch:      {bs.get('arch', 'x86_64')}")
+        out.append(f"  Tool:      {bs.get('tool', 'lorax')}")
     else:
-        print(f"  Base ISO:  {manifest.get('base_iso', 'N/A')}")
+        out.append(f"  Base ISO:  {manifest.get('base_iso', 'N/A')}")
 
-    print(f"  GUI:       {gui_str}")
-    print(f"  Repos:     {len(repos)} custom")
-    print(f"  Packages:  +{len(pkgs_install)}, -{len(pkgs_remove)}")
+    out.append(f"  GUI:       {gui_str}")
+    out.append(f"  Repos:     {len(repos)} custom")
+    out.append(f"  Packages:  +{len(pkgs_install)}, -{len(pkgs_remove)}")
 
     branding = manifest.get("branding", {})
     if branding.get("assets_dir"):
-        print(f"  Branding:  {branding['assets_dir']}")
+        out.append(f"  Branding:  {branding['assets_dir']}")
     else:
-        print(f"  Branding:  Auto-generated (text only)")
+        out.append(f"  Branding:  Auto-generated (text only)")
+
+    out.append(f"  SELinux:   {manifest.get('selinux', 'enforcing')}")
+    out.append(f"  Firewall:  {'Enabled' if manifest.get('firewall') else 'Disabled'}")
+    out.append("─" * 50)
+    sys.stdout.write("\n".join(out) + "\n")
+
 
-    print(f"  SELinux:   {manifest.get('selinux', 'enforcing')}")
-    print(f"  Firewall:  {'Enabled' if manifest.get('firewall') else 'Disabled'}")
-    print("─" * 50)
+def check_dependencies_json():
+    """--check-deps-json: {name: found} on one line, for scripts and CI."""
+    from engine.fsutil import which
+    tools = (*_REQUIRED_TOOLS, "createrepo", *_OPTIONAL_TOOLS)
+    result = {tool: which(tool) is not None for tool in tools}
+    for module, name in (("yaml", "PyYAML"), ("isal", "isal")):
+        result[name] = importlib.util.find_spec(module) is not None
+    sys.stdout.write(json.dumps(result) + "\n")
 
 
 def check_dependencies():
     """Check and report on all required/optional dependencies."""
-    print("🔍 Checking dependencies...\n")
-
-    required = {
-        "python3": "Python 3.8+",
-        "xorriso": "ISO creation & extraction",
-        "createrepo_c": "Repository metadata (fallback: createrepo)",
-    }
-
-    optional = {
-        "lorax": "Build system — compose install trees",
-        "pungi-koji": "Build system — full production composes",
-        "mock": "Build system — RPM building in chroot",
-        "mksquashfs": "Product.img for Anaconda branding",
-        "isohybrid": "USB-bootable ISO creation",
-        "implantisomd5": "ISO integrity checksums",
-        "isoinfo": "Read ISO volume information",
-        "7z": "Alternative ISO extraction",
-    }
-
-    print("  Required:")
+    out = []
+    out.append("🔍 Checking dependencies...\n")
+
+    from engine.fsutil import which
+    required, optional = _REQUIRED_TOOLS, _OPTIONAL_TOOLS
+
+    out.append("  Required:")
     all_ok = True
     for tool, desc in required.items():
-        found = shutil.which(tool)
+        found = which(tool) is not None
         status = "✅" if found else "❌"
         if not found:
             all_ok = False
-        print(f"    {status} {tool:20s} — {desc}")
+        out.append(f"    {status} {tool:20s} — {desc}")
 
     # Special check: createrepo or createrepo_c
-    if not shutil.which("createrepo_c"):
-        if shutil.which("createrepo"):
-            print(f"    ✅ {'createrepo':20s} — (fallback for createrepo_c)")
+    if not which("createrepo_c"):
+        if which("createrepo"):
+            out.append(f"    ✅ {'createrepo':20s} — (fallback for createrepo_c)")
         else:
-            print(f"    ❌ {'createrepo_c':20s} — Repository metadata")
+            out.append(f"    ❌ {'createrepo_c':20s} — Repository metadata")
             all_ok = False
 
-    print("\n  Optional:")
+    out.append("\n  Optional:")
     for tool, desc in optional.items():
-        found = shutil.which(tool)
-        status = "✅" if found else "⬜" 
-        print(f"    {status} {tool:20s} — {desc}")
+        found = which(tool) is not None
+        status = "✅" if found else "⬜"
+        out.append(f"    {status} {tool:20s} — {desc}")
 
     # Check Python packages
-    print("\n  Python packages:")
+    out.append("\n  Python packages:")
     try:
         import yaml
-        print(f"    ✅ {'PyYAML':20s} — YAML manifest support")
+        out.append(f"    ✅ {'PyYAML':20s} — YAML manifest support")
     except ImportError:
-        print(f"    ❌ {'PyYAML':20s} — pip install PyYAML")
+        out.append(f"    ❌ {'PyYAML':20s} — pip install PyYAML")
+    try:
+        import isal
+        out.append(f"    ✅ {'isal':20s} — Faster product.img compression")
+    except ImportError:
+        out.append(f"    ⬜ {'isal':20s} — Faster product.img compression (pip install isal)")
 
-    print()
+    out.append("")
     if all_ok:
-        print("  ✅ All required dependencies satisfied!")
+        out.append("  ✅ All required dependencies satisfied!")
     else:
-        print("  ❌ Some required dependencies are missing.")
-        print("     Install them with: dnf install <package>")
+        out.append("  ❌ Some required dependencies are missing.")
+        out.append("     Install them with: dnf install <package>")
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+def _write_text(blob):
+    """Write one (path, text) pair from generate_sample_assets."""
+    path, text = blob
+    with open(path, "w") as f:
+        f.write(text)
 
 
 def generate_sample_assets(target_dir):
@@ -294,86 +476,28 @@ def generate_sample_assets(target_dir):
     target = Path(target_dir)
     print(f"📁 Generating sample assets structure at: {target}\n")
 
-    dirs = [
-        target / "grub",
-        target / "plymouth",
-        target / "anaconda",
-        target / "logos",
-    ]
-    for d in dirs:
-        d.mkdir(parents=True, exist_ok=True)
-
-    # GRUB theme template
-    (target / "grub" / "theme.txt").write_text(
-        "# GRUB Theme — customize this\n"
-        "# See: https://www.gnu.org/software/grub/manual/grub/html_node/Theme-file-format.html\n"
-        "\n"
-        "title-text: \"\"\n"
-        "desktop-color: \"#1a1a2e\"\n"
-        "terminal-font: \"DejaVu Sans Mono Regular 14\"\n"
-        "\n"
-        "+ boot_menu {\n"
-        "  left = 15%\n"
-        "  top = 25%\n"
-        "  width = 70%\n"
-        "  height = 50%\n"
-        "  item_font = \"DejaVu Sans Regular 16\"\n"
-        "  item_color = \"#cccccc\"\n"
-        "  selected_item_color = \"#ffffff\"\n"
-        "  item_height = 30\n"
-        "  item_spacing = 5\n"
-        "}\n"
-    )
-
-    # Plymouth theme template
-    (target / "plymouth" / "README.md").write_text(
-        "# Plymouth Boot Splash\n\n"
-        "Place your Plymouth theme files here:\n"
-        "- `*.plymouth` — theme descriptor\n"
-        "- `*.script` — animation script\n"
-        "- `*.png` — splash images / logo\n\n"
-        "Example minimal theme:\n"
-        "```\n"
-        "[Plymouth Theme]\n"
-        "Name=MyDistro\n"
-        "Description=MyDistro boot splash\n"
-        "ModuleName=script\n"
-        "\n"
-        "[script]\n"
-        "ImageDir=/usr/share/plymouth/themes/mydistro\n"
-        "ScriptFile=/usr/share/plymouth/themes/mydistro/mydistro.script\n"
-        "```\n"
-    )
-
-    # Anaconda branding template
-    (target / "anaconda" / "README.md").write_text(
-        "# Anaconda Installer Branding\n\n"
-        "Place your installer images here:\n"
-        "- `sidebar-logo.png` — sidebar logo (approximately 300x600)\n"
-        "- `topbar-bg.png` — topbar background\n"
-        "- `banner-bg.png` — banner background\n"
-        "- `progress-first.png` — install progress first screen\n\n"
-        "These get packed into `product.img` and overlaid\n"
-        "on the Anaconda installer at boot time.\n"
-    )
+    t = os.fspath(target)
+    for d in ("grub", "plymouth", "anaconda", "logos"):
+        os.makedirs(os.path.join(t, d), exist_ok=True)
 
-    # Logos template
-    (target / "logos" / "README.md").write_text(
-        "# OS Logos\n\n"
-        "Place your distro logos here:\n"
-        "- `logo.png` — main logo (256x256 recommended)\n"
-        "- `logo.svg` — vector logo\n"
-        "- `logo-small.png` — small variant (64x64)\n"
-        "- `watermark.png` — GNOME/GDM watermark\n"
-        "- `favicon.ico` — for any web interfaces\n"
-    )
-
-    print("  Created:")
-    print(f"    📁 {target}/grub/         — GRUB theme template")
-    print(f"    📁 {target}/plymouth/     — Plymouth splash readme")
-    print(f"    📁 {target}/anaconda/     — Installer branding readme")
-    print(f"    📁 {target}/logos/        — Logo placement guide")
-    print(f"\n  Fill in your assets and point the wizard to this directory.")
+    blobs = [
+        (os.path.join(t, "grub", "theme.txt"), _GRUB_THEME_TXT),
+        (os.path.join(t, "plymouth", "README.md"), _PLYMOUTH_README),
+        (os.path.join(t, "anaconda", "README.md"), _ANACONDA_README),
+        (os.path.join(t, "logos", "README.md"), _LOGOS_README),
+    ]
+    # Independent files: overlap the open/write/close round trips
+    with ThreadPoolExecutor(max_workers=len(blobs)) as pool:
+        list(pool.map(_write_text, blobs))
+
+    sys.stdout.write("\n".join([
+        "  Created:",
+        f"    📁 {target}/grub/         — GRUB theme template",
+        f"    📁 {target}/plymouth/     — Plymouth splash readme",
+        f"    📁 {target}/anaconda/     — Installer branding readme",
+        f"    📁 {target}/logos/        — Logo placement guide",
+        "\n  Fill in your assets and point the wizard to this directory.",
+    ]) + "\n")
 
 
 if __name__ == "__main__":